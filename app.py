@@ -26,6 +26,26 @@ except ImportError:
             return MockResult()
     JSON = "json"
 
+try:
+    import orjson
+    from flask.json.provider import DefaultJSONProvider
+
+    class OrjsonProvider(DefaultJSONProvider):
+        """Flask JSON provider backed by orjson; keeps Flask's key sorting and debug indentation"""
+        def dumps(self, obj, **kwargs):
+            option = orjson.OPT_NON_STR_KEYS
+            if kwargs.get("sort_keys", self.sort_keys):
+                option |= orjson.OPT_SORT_KEYS
+            if kwargs.get("indent"):
+                option |= orjson.OPT_INDENT_2
+            return orjson.dumps(obj, default=self.default, option=option).decode()
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+except ImportError:
+    # Flask < 2.2 or orjson missing: keep the default json module
+    OrjsonProvider = None
+
 from ai_sparql_transformer import sparql_transformer
 from transport_mode.routes import router as transport_mode_router
 from travel_plan.routes import router as travel_plan_router
@@ -37,6 +57,10 @@ from health_monitoring.routes import router as health_monitoring_router
 from sparql_service import SPARQLQueryService, get_sparql_service
 
 app = Flask(__name__)
+
+# Serialize jsonify() responses with orjson when available (much faster on large binding lists)
+if OrjsonProvider is not None:
+    app.json = OrjsonProvider(app)
 # FUSEKI endpoints will be defined later after imports
 
 
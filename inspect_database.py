@@ -3,8 +3,14 @@
 Database inspection script to show what data is currently in Fuseki
 """
 
+import sys
+
 import requests
-import json
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    # Fallback to the stdlib parser when orjson is not installed
+    from json import loads as json_loads
 
 FUSEKI_QUERY_ENDPOINT = "http://localhost:3030/smartcity/query"
 
@@ -21,11 +27,13 @@ def execute_query(query, description):
         )
         
         if response.status_code == 200:
-            data = response.json()
+            data = json_loads(response.content)
             bindings = data.get('results', {}).get('bindings', [])
             
+            # Buffer every row and write once instead of one print() per row
+            lines = []
             if bindings:
-                print(f"Found {len(bindings)} results:")
+                lines.append(f"Found {len(bindings)} results:")
                 
                 for i, binding in enumerate(bindings, 1):
                     result_parts = []
@@ -33,14 +41,16 @@ def execute_query(query, description):
                         val = value.get('value', 'N/A')
                         # Shorten long URIs for readability
                         if val.startswith('http://www.semanticweb.org/monpc/ontologies/2025/9/untitled-ontology-4#'):
-                            val = val.split('#')[-1]
+                            val = val.rpartition('#')[2]
                         elif val.startswith('http://www.w3.org/'):
-                            val = val.split('/')[-1] if '/' in val else val.split('#')[-1]
+                            val = val.rpartition('/')[2]
                         result_parts.append(f"{var}: {val}")
                     
-                    print(f"  {i:2d}. {' | '.join(result_parts)}")
+                    lines.append(f"  {i:2d}. {' | '.join(result_parts)}")
             else:
-                print("No results found")
+                lines.append("No results found")
+            
+            sys.stdout.write("\n".join(lines) + "\n")
                 
         else:
             print(f"Query failed: {response.status_code} - {response.text}")
@@ -7,7 +7,7 @@ import re
 import logging
 from typing import Dict, Any, Optional, List
 from dataclasses import dataclass
-from sparql_service import get_sparql_service
+from sparql_service import escape_sparql_literal, get_sparql_service
 try:
     from SPARQLWrapper import SPARQLWrapper, JSON
 except ImportError:
@@ -25,6 +25,25 @@ except ImportError:
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Keyword search query; ?kw is bound through VALUES so the query structure stays stable
+KEYWORD_SEARCH_QUERY = """PREFIX : <{namespace}>
+PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+
+SELECT DISTINCT ?concept ?label ?type
+WHERE {{
+    VALUES ?kw {{ "{keyword}" }}
+    ?concept rdf:type ?type .
+    OPTIONAL {{ ?concept rdfs:label ?label . }}
+    OPTIONAL {{ ?concept :hasName ?label . }}
+    FILTER(
+        regex(str(?concept), ?kw, "i") ||
+        regex(str(?label), ?kw, "i")
+    )
+}}
+ORDER BY ?concept
+LIMIT 50"""
+
 @dataclass
 class SearchResult:
     """Represents a search result from ontology concept search"""
@@ -86,23 +105,11 @@ class OntologySearchService:
         
         keyword = keyword.strip()
         
-        # SPARQL query for keyword-based concept search
-        query = f"""PREFIX : <{self.ontology_namespace}>
-PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-
-SELECT DISTINCT ?concept ?label ?type
-WHERE {{
-    ?concept rdf:type ?type .
-    OPTIONAL {{ ?concept rdfs:label ?label . }}
-    OPTIONAL {{ ?concept :hasName ?label . }}
-    FILTER(
-        regex(str(?concept), "{keyword}", "i") ||
-        regex(str(?label), "{keyword}", "i")
-    )
-}}
-ORDER BY ?concept
-LIMIT 50"""
+        # The query text is fixed; only the escaped keyword literal in VALUES changes
+        query = KEYWORD_SEARCH_QUERY.format(
+            namespace=self.ontology_namespace,
+            keyword=escape_sparql_literal(keyword)
+        )
         
         logger.info(f"Executing search query for keyword: {keyword}")
         
@@ -224,10 +231,14 @@ ORDER BY ?parent ?class"""
         nodes = {}
         root_nodes = []
         
+        # Bind hot attribute lookups to locals before iterating the bindings
+        ns = self.ontology_namespace
+        extract = self._extract_local_name
+        
         for binding in results.get("results", {}).get("bindings", []):
             class_uri = binding["class"]["value"]
-            class_label = binding.get("label", {}).get("value", self._extract_local_name(class_uri))
-            parent_uri = binding.get("parent", {}).get("value")
+            class_label = binding["label"]["value"] if "label" in binding else extract(class_uri)
+            parent_uri = binding["parent"]["value"] if "parent" in binding else None
             
             # Create node if it doesn't exist
             if class_uri not in nodes:
@@ -242,9 +253,9 @@ ORDER BY ?parent ?class"""
             nodes[class_uri].parent = parent_uri
             
             # Create parent node if it doesn't exist and is within our ontology
-            if parent_uri and parent_uri.startswith(self.ontology_namespace):
+            if parent_uri and parent_uri.startswith(ns):
                 if parent_uri not in nodes:
-                    parent_label = binding.get("parentLabel", {}).get("value", self._extract_local_name(parent_uri))
+                    parent_label = binding["parentLabel"]["value"] if "parentLabel" in binding else extract(parent_uri)
                     nodes[parent_uri] = HierarchyNode(
                         uri=parent_uri,
                         label=parent_label,
@@ -1,28 +1,236 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, stream_with_context
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from cachetools import TTLCache
+from hashlib import blake2b
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import io
+import logging
 import os
 import re
+import threading
+from operator import itemgetter
+from urllib.parse import urlencode
+
+from sparql_service import escape_sparql_literal
+
+logger = logging.getLogger(__name__)
 
 router = Blueprint('parking_station', __name__)
 
 FUSEKI_QUERY = os.getenv('FUSEKI_QUERY', 'http://localhost:3030/smartcity/query')
 FUSEKI_UPDATE = os.getenv('FUSEKI_UPDATE', 'http://localhost:3030/smartcity/update')
 
+NS = "http://www.semanticweb.org/monpc/ontologies/2025/9/untitled-ontology-4#"
+
+# Localnames acceptés dans les URIs de stations
+_LOCALNAME_RE = re.compile(r'[A-Za-z0-9_\-]{1,128}')
+
+# Prologue commun à toutes les requêtes SELECT, encodé une seule fois
+PREFIX_BYTES = (
+    f"PREFIX sc: <{NS}>\n"
+    "PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>\n"
+).encode('utf-8')
+
+# (connect, read) timeouts for Fuseki calls
+FUSEKI_TIMEOUT = (2, 10)
+
+# Size of the keep-alive pool; match it to the number of worker threads serving requests
+FUSEKI_POOL_MAXSIZE = int(os.getenv('FUSEKI_POOL_MAXSIZE', '64'))
+
+# Shared HTTP session so every Fuseki call reuses pooled keep-alive connections
+SESSION = requests.Session()
+SESSION.headers.update({"Connection": "keep-alive", "Accept-Encoding": "gzip"})
+SESSION.mount("http://", HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=FUSEKI_POOL_MAXSIZE,
+    max_retries=Retry(total=2, backoff_factor=0.1, status_forcelist=[502, 503, 504])
+))
+
+# Fuseki's dedicated SPARQL results writer instead of its generic JSON path
+QUERY_HEADERS = {"Content-Type": "application/sparql-query", "Accept": "application/sparql-results+json"}
+
 def execute_sparql_query(query, expect_json=True):
-    """Exécute une requête SPARQL SELECT/ASK. Lève une exception en cas d'erreur."""
+    """
+    Exécute une requête SPARQL SELECT/ASK. Lève une exception en cas d'erreur.
+    Les déclarations PREFIX (pré-encodées) sont ajoutées devant la requête.
+    """
     try:
-        headers = {"Content-Type": "application/sparql-query", "Accept": "application/json"}
-        resp = requests.post(FUSEKI_QUERY, data=query.encode('utf-8'), headers=headers, timeout=10)
+        body = PREFIX_BYTES + query.encode('utf-8')
+        resp = SESSION.post(FUSEKI_QUERY, data=body, headers=QUERY_HEADERS, timeout=FUSEKI_TIMEOUT)
         resp.raise_for_status()
-        return resp.json() if expect_json else resp.text
+        return orjson.loads(resp.content) if expect_json else resp.text
     except Exception as e:
         raise RuntimeError(f"SPARQL query failed: {e}")
 
+def read_json_body():
+    """Décode le corps de la requête avec orjson, sans le mettre en cache. Lève ValueError si invalide."""
+    raw = request.get_data(cache=False)
+    return orjson.loads(raw) if raw else None
+
+def json_response(obj, status=200, headers=None):
+    """Sérialise obj avec orjson et renvoie une réponse JSON Flask."""
+    return Response(orjson.dumps(obj), status=status, headers=headers, mimetype="application/json")
+
+def stream_stations_response(stations, headers=None):
+    """Renvoie {"stations": [...]} en flux, chaque station étant sérialisée à la volée."""
+    def generate():
+        yield b'{"stations":['
+        for index, station in enumerate(stations):
+            if index:
+                yield b','
+            yield orjson.dumps(station)
+        yield b']}'
+    return Response(stream_with_context(generate()), headers=headers, mimetype="application/json")
+
+# Types de stations de stationnement pris en charge
+PARKING_TYPES = ("CarParkingStation", "BikeParkingStation", "EVChargingStation")
+PARKING_TYPE_VALUES = " ".join(f"sc:{t}" for t in PARKING_TYPES)
+
+# Colonnes optionnelles renvoyées pour chaque station
+FIELDS = ("type", "name", "capacity", "availableSpaces", "pricePerHour", "address", "latitude", "longitude", "operatingHours")
+
+# Propriétés lues en un seul OPTIONAL (VALUES ?p), puis pivotées en colonnes côté Python
+STATION_PROPERTIES = (
+    ("hasName", "name"),
+    ("hasCapacity", "capacity"),
+    ("hasAvailableSpaces", "availableSpaces"),
+    ("hasPricePerHour", "pricePerHour"),
+    ("hasAddress", "address"),
+    ("hasLatitude", "latitude"),
+    ("hasLongitude", "longitude"),
+    ("hasOperatingHours", "operatingHours"),
+)
+PRED_TO_FIELD = {NS + p: f for p, f in STATION_PROPERTIES}
+PREDICATE_VALUES = " ".join(f"sc:{p}" for p, _ in STATION_PROPERTIES)
+
+# Pagination de la liste des stations
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Squelettes de requêtes construits une fois; seules les parties variables sont substituées
+LIST_WHERE_TMPL = """
+      {{
+        SELECT ?station ?type ?name
+        WHERE {{
+          {name_subquery}
+          VALUES ?type {{ {type_values} }}
+          ?station a ?type .
+          OPTIONAL {{ ?station sc:hasName ?name . }}
+          {name_filter}
+        }}
+        ORDER BY ?name ?station
+        LIMIT {limit} OFFSET {offset}
+      }}"""
+
+GET_WHERE_TMPL = """
+      VALUES ?station {{ <{uri}> }}
+      VALUES ?type {{ {type_values} }}
+      ?station a ?type ."""
+
+# Jointure des propriétés commune aux requêtes LIST et GET
+_PROPERTY_OPTIONAL = f"""
+      OPTIONAL {{
+        ?station ?p ?val .
+        VALUES ?p {{ {PREDICATE_VALUES} }}
+      }}"""
+
+def _build_station_query(where, order=""):
+    """Assemble une requête station (?station ?type ?p ?val) autour d'un motif WHERE."""
+    return f"""
+    SELECT ?station ?type ?p ?val
+    WHERE {{{where}{_PROPERTY_OPTIONAL}
+    }}
+    {order}
+    """
+
+# Accès C à la clé "value" d'un terme SPARQL JSON
+_GET_VALUE = itemgetter("value")
+
+def stations_from_bindings(bindings):
+    """Regroupe les lignes (?station ?type ?p ?val) en un dictionnaire par station."""
+    stations = {}
+    field_for = PRED_TO_FIELD.get
+    for b in bindings:
+        uri = _GET_VALUE(b["station"])
+        station = stations.get(uri)
+        if station is None:
+            station = stations[uri] = {"uri": uri, **dict.fromkeys(FIELDS)}
+            station["type"] = _GET_VALUE(b["type"])
+        if "p" in b:
+            field = field_for(_GET_VALUE(b["p"]))
+            if field:
+                station[field] = _GET_VALUE(b["val"])
+    return list(stations.values())
+
+# Short-lived cache of SELECT results, cleared on every successful write
+QUERY_CACHE_TTL = 30
+CACHE_HEADERS = {"Cache-Control": f"max-age={QUERY_CACHE_TTL}"}
+_query_cache = TTLCache(maxsize=512, ttl=QUERY_CACHE_TTL)
+_query_cache_lock = threading.Lock()
+
+def cached_query(query):
+    """Comme execute_sparql_query, mais sert les résultats depuis le cache TTL si possible."""
+    key = blake2b(query.encode('utf-8'), digest_size=16).digest()
+    with _query_cache_lock:
+        cached = _query_cache.get(key)
+    if cached is not None:
+        return cached
+    results = execute_sparql_query(query)
+    with _query_cache_lock:
+        _query_cache[key] = results
+    return results
+
+def invalidate_query_cache():
+    """Vide le cache des requêtes après une modification du graphe."""
+    with _query_cache_lock:
+        _query_cache.clear()
+
+# Suppressions exécutées en arrière-plan, indexées par URI tant qu'elles sont en cours ;
+# les échecs restent consultables (GET de la station) pendant FAILED_DELETE_TTL secondes
+EXEC = ThreadPoolExecutor(max_workers=8)
+FAILED_DELETE_TTL = 300
+_pending_deletes = {}
+_failed_deletes = TTLCache(maxsize=256, ttl=FAILED_DELETE_TTL)
+_pending_deletes_lock = threading.Lock()
+
+def _do_fuseki_update(update_query):
+    """Envoie une requête SPARQL UPDATE à Fuseki. Lève une exception en cas d'erreur."""
+    headers = {"Content-Type": "application/sparql-update"}
+    resp = SESSION.post(FUSEKI_UPDATE, data=update_query.encode('utf-8'), headers=headers, timeout=FUSEKI_TIMEOUT)
+    resp.raise_for_status()
+
+def _finish_delete(uri, future):
+    """
+    Retire une suppression terminée de la liste des suppressions en cours
+    et mémorise son erreur éventuelle.
+    """
+    error = future.exception()
+    with _pending_deletes_lock:
+        if _pending_deletes.get(uri) is future:
+            del _pending_deletes[uri]
+            if error is not None:
+                _failed_deletes[uri] = str(error)
+    invalidate_query_cache()
+    if error is not None:
+        logger.error("Background delete of %s failed: %s", uri, error)
+
+def is_delete_pending(uri):
+    """Indique si une suppression de cette station est encore en cours."""
+    with _pending_deletes_lock:
+        return uri in _pending_deletes
+
+def failed_delete_error(uri):
+    """Message d'erreur de la dernière suppression échouée de cette station, ou None."""
+    with _pending_deletes_lock:
+        return _failed_deletes.get(uri)
+
 def safe_localname(name):
     """Autorise seulement un localname simple pour éviter injection / caractères dangereux."""
-    if not name or not re.match(r'^[A-Za-z0-9_\-]+$', name):
-        return None
-    return name
+    return name if name and _LOCALNAME_RE.fullmatch(name) else None
 
 @router.route('/', methods=['GET'])
 def list_parking_stations():
@@ -32,162 +240,196 @@ def list_parking_stations():
     Optional params:
       - q : filter by name substring
       - type : filter by parking type (CarParkingStation, BikeParkingStation, EVChargingStation)
+      - limit : page size (default 100, max 1000)
+      - offset : number of stations to skip (default 0)
     """
-    q = request.args.get('q', '').replace('"', '\\"')
+    q = request.args.get('q', '')
     parking_type = request.args.get('type', '')
+    try:
+        limit = min(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        return json_response({"error": "limit and offset must be integers"}, 400)
+    if limit < 1:
+        return json_response({"error": "limit must be positive"}, 400)
+    if offset < 0:
+        return json_response({"error": "offset must not be negative"}, 400)
+
+    if q and ('\\' in q or not q.isprintable()):
+        return json_response({"error": "invalid q"}, 400)
+
+    # Build filter clauses: case-insensitive substring match without the regex engine.
+    # Longer terms are selective enough to bind ?station from the name first.
+    name_subquery = ""
+    name_filter = ""
+    if q:
+        needle = escape_sparql_literal(q.lower())
+        name_match = f'CONTAINS(LCASE(str(?name)), "{needle}")'
+        if len(q) > 2:
+            name_subquery = f"{{ SELECT DISTINCT ?station WHERE {{ ?station sc:hasName ?name . FILTER({name_match}) }} }}"
+        else:
+            name_filter = f"FILTER({name_match})"
 
-    ns = "http://www.semanticweb.org/monpc/ontologies/2025/9/untitled-ontology-4#"
-
-    # Build filter clauses
-    name_filter = f'FILTER regex(str(?name), "{q}", "i")' if q else ""
-    type_filter = ""
+    # Bind ?type to a VALUES set the planner can probe directly instead of an OR filter
     if parking_type:
-        type_filter = f"FILTER(?type = <{ns}{parking_type}>)"
-
-    query = f"""
-    PREFIX sc: <{ns}>
-    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-
-    SELECT ?station ?type ?name ?capacity ?availableSpaces ?pricePerHour ?address ?latitude ?longitude ?operatingHours
-    WHERE {{
-      ?station a ?type .
-      FILTER(?type = sc:CarParkingStation || ?type = sc:BikeParkingStation || ?type = sc:EVChargingStation)
-      OPTIONAL {{ ?station sc:hasName ?name . }}
-      OPTIONAL {{ ?station sc:hasCapacity ?capacity . }}
-      OPTIONAL {{ ?station sc:hasAvailableSpaces ?availableSpaces . }}
-      OPTIONAL {{ ?station sc:hasPricePerHour ?pricePerHour . }}
-      OPTIONAL {{ ?station sc:hasAddress ?address . }}
-      OPTIONAL {{ ?station sc:hasLatitude ?latitude . }}
-      OPTIONAL {{ ?station sc:hasLongitude ?longitude . }}
-      OPTIONAL {{ ?station sc:hasOperatingHours ?operatingHours . }}
-      {name_filter}
-      {type_filter}
-    }}
-    ORDER BY ?name
-    """
-
-    results = execute_sparql_query(query)
+        if parking_type not in PARKING_TYPES:
+            return json_response({"error": "invalid type"}, 400)
+        type_values = f"sc:{parking_type}"
+    else:
+        type_values = PARKING_TYPE_VALUES
+
+    where = LIST_WHERE_TMPL.format(
+        name_subquery=name_subquery,
+        type_values=type_values,
+        name_filter=name_filter,
+        limit=limit,
+        offset=offset
+    )
+    query = _build_station_query(where, order="ORDER BY ?name ?station")
+
+    results = cached_query(query)
     bindings = results.get("results", {}).get("bindings", []) if results else []
 
-    stations = []
-    for b in bindings:
-        stations.append({
-            "uri": b["station"]["value"],
-            "type": b.get("type", {}).get("value"),
-            "name": b.get("name", {}).get("value"),
-            "capacity": b.get("capacity", {}).get("value"),
-            "availableSpaces": b.get("availableSpaces", {}).get("value"),
-            "pricePerHour": b.get("pricePerHour", {}).get("value"),
-            "address": b.get("address", {}).get("value"),
-            "latitude": b.get("latitude", {}).get("value"),
-            "longitude": b.get("longitude", {}).get("value"),
-            "operatingHours": b.get("operatingHours", {}).get("value")
-        })
-
-    return jsonify({"stations": stations})
+    # Rows arrive ordered by name then station IRI; the pivot keeps that order
+    stations = stations_from_bindings(bindings)
+
+    headers = CACHE_HEADERS
+    if len(stations) == limit:
+        args = request.args.to_dict()
+        args.update(limit=limit, offset=offset + limit)
+        headers = {**CACHE_HEADERS, "Link": f'<{request.base_url}?{urlencode(args)}>; rel="next"'}
+
+    return stream_stations_response(stations, headers=headers)
 
 
 @router.route('/<path:localname>', methods=['GET'])
 def get_parking_station(localname):
     """
     GET /api/parking-stations/<localname>
-    Fetch a specific parking station by its localname
-    """
-    q_local = localname.replace('"', '\\"')
-    ns = "http://www.semanticweb.org/monpc/ontologies/2025/9/untitled-ontology-4#"
-
-    query = f"""
-    PREFIX sc: <{ns}>
-    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-
-    SELECT ?station ?type ?name ?capacity ?availableSpaces ?pricePerHour ?address ?latitude ?longitude ?operatingHours
-    WHERE {{
-      ?station a ?type .
-      FILTER(?type = sc:CarParkingStation || ?type = sc:BikeParkingStation || ?type = sc:EVChargingStation)
-      FILTER(strafter(str(?station), "#") = "{q_local}" || strends(str(?station), "/{q_local}"))
-
-      OPTIONAL {{ ?station sc:hasName ?name . }}
-      OPTIONAL {{ ?station sc:hasCapacity ?capacity . }}
-      OPTIONAL {{ ?station sc:hasAvailableSpaces ?availableSpaces . }}
-      OPTIONAL {{ ?station sc:hasPricePerHour ?pricePerHour . }}
-      OPTIONAL {{ ?station sc:hasAddress ?address . }}
-      OPTIONAL {{ ?station sc:hasLatitude ?latitude . }}
-      OPTIONAL {{ ?station sc:hasLongitude ?longitude . }}
-      OPTIONAL {{ ?station sc:hasOperatingHours ?operatingHours . }}
-    }}
-    LIMIT 1
+    Fetch a specific parking station by its localname.
+    If a background DELETE of the station failed recently, the station is returned
+    with a "deleteError" field.
     """
+    if not safe_localname(localname):
+        return json_response({"error": "invalid localname"}, 400)
+    uri = NS + localname
+    if is_delete_pending(uri):
+        return json_response({"error": "Not found"}, 404)
+
+    query = _build_station_query(GET_WHERE_TMPL.format(uri=uri, type_values=PARKING_TYPE_VALUES))
 
-    res = execute_sparql_query(query)
+    res = cached_query(query)
     binds = res.get("results", {}).get("bindings", []) if res else []
 
     if binds:
-        b = binds[0]
-        return jsonify({
-            "uri": b["station"]["value"],
-            "type": b.get("type", {}).get("value"),
-            "name": b.get("name", {}).get("value"),
-            "capacity": b.get("capacity", {}).get("value"),
-            "availableSpaces": b.get("availableSpaces", {}).get("value"),
-            "pricePerHour": b.get("pricePerHour", {}).get("value"),
-            "address": b.get("address", {}).get("value"),
-            "latitude": b.get("latitude", {}).get("value"),
-            "longitude": b.get("longitude", {}).get("value"),
-            "operatingHours": b.get("operatingHours", {}).get("value")
-        })
-
-    return jsonify({"error": "Not found"}), 404
+        station = stations_from_bindings(binds)[0]
+        delete_error = failed_delete_error(uri)
+        if delete_error is not None:
+            station["deleteError"] = delete_error
+        return json_response(station, headers=CACHE_HEADERS)
 
+    return json_response({"error": "Not found"}, 404)
 
-@router.route('/', methods=['POST'])
-def create_parking_station():
-    data = request.get_json() or {}
+
+# IRIs précalculées pour l'écriture des triples
+HAS_NAME_IRI = f"<{NS}hasName>"
+HAS_CAPACITY_IRI = f"<{NS}hasCapacity>"
+HAS_AVAILABLE_SPACES_IRI = f"<{NS}hasAvailableSpaces>"
+HAS_PRICE_PER_HOUR_IRI = f"<{NS}hasPricePerHour>"
+XSD_INTEGER_IRI = "<http://www.w3.org/2001/XMLSchema#integer>"
+XSD_FLOAT_IRI = "<http://www.w3.org/2001/XMLSchema#float>"
+
+# Champs numériques acceptés à la création et leur conversion
+NUMERIC_FIELDS = (("capacity", int), ("availableSpaces", int), ("pricePerHour", float))
+
+def write_station_triples(buf, data):
+    """
+    Valide une station et écrit ses triples dans buf.
+    Renvoie (uri, None) en cas de succès ou (None, message d'erreur).
+    """
+    if not isinstance(data, dict):
+        return None, "station must be an object"
     localname = data.get("localname")
     station_type = data.get("type")
     name = data.get("name")
 
     # validation simple
     if not safe_localname(localname):
-        return jsonify({"error": "invalid localname"}), 400
-    if station_type not in ("CarParkingStation", "BikeParkingStation", "EVChargingStation"):
-        return jsonify({"error": "invalid type"}), 400
-
-    # cast numériques si fournis
-    capacity = data.get("capacity")
-    available_spaces = data.get("availableSpaces")
-    price_per_hour = data.get("pricePerHour")
-    try:
-        capacity = int(capacity) if capacity is not None else None
-        available_spaces = int(available_spaces) if available_spaces is not None else None
-        price_per_hour = float(price_per_hour) if price_per_hour is not None else None
-    except (ValueError, TypeError):
-        return jsonify({"error": "numeric fields must be numbers"}), 400
+        return None, "invalid localname"
+    if station_type not in PARKING_TYPES:
+        return None, "invalid type"
+
+    # cast numériques si fournis, d'après le schéma précalculé
+    numbers = {}
+    for field, cast in NUMERIC_FIELDS:
+        value = data.get(field)
+        if value is None:
+            numbers[field] = None
+            continue
+        try:
+            numbers[field] = cast(value)
+        except (ValueError, TypeError):
+            return None, "numeric fields must be numbers"
+    capacity = numbers["capacity"]
+    available_spaces = numbers["availableSpaces"]
+    price_per_hour = numbers["pricePerHour"]
 
     if capacity is not None and available_spaces is not None and available_spaces > capacity:
-        return jsonify({"error": "availableSpaces cannot exceed capacity"}), 400
+        return None, "availableSpaces cannot exceed capacity"
 
-    base_uri = "http://www.semanticweb.org/monpc/ontologies/2025/9/untitled-ontology-4#"
-    uri = base_uri + localname
+    uri = NS + localname
+    subject = f"<{uri}>"
 
-    triples = [f"<{uri}> a <{base_uri}{station_type}> ."]
+    buf.write(f"{subject} a <{NS}{station_type}> .\n")
     if name:
-        safe_name = name.replace('"', '\\"')
-        triples.append(f'<{uri}> <{base_uri}hasName> "{safe_name}" .')
+        buf.write(f'{subject} {HAS_NAME_IRI} "{escape_sparql_literal(name)}" .\n')
     if capacity is not None:
-        triples.append(f'<{uri}> <{base_uri}hasCapacity> "{capacity}"^^<http://www.w3.org/2001/XMLSchema#integer> .')
+        buf.write(f'{subject} {HAS_CAPACITY_IRI} "{capacity}"^^{XSD_INTEGER_IRI} .\n')
     if available_spaces is not None:
-        triples.append(f'<{uri}> <{base_uri}hasAvailableSpaces> "{available_spaces}"^^<http://www.w3.org/2001/XMLSchema#integer> .')
+        buf.write(f'{subject} {HAS_AVAILABLE_SPACES_IRI} "{available_spaces}"^^{XSD_INTEGER_IRI} .\n')
     if price_per_hour is not None:
-        triples.append(f'<{uri}> <{base_uri}hasPricePerHour> "{price_per_hour}"^^<http://www.w3.org/2001/XMLSchema#float> .')
+        buf.write(f'{subject} {HAS_PRICE_PER_HOUR_IRI} "{price_per_hour}"^^{XSD_FLOAT_IRI} .\n')
+
+    return uri, None
+
+@router.route('/', methods=['POST'])
+def create_parking_station():
+    """
+    POST /api/parking-stations/
+    Create one parking station, or several when the body is a JSON array.
+    All stations of a bulk request are written in a single INSERT DATA.
+    """
+    try:
+        data = read_json_body()
+    except ValueError:
+        return json_response({"error": "invalid JSON body"}, 400)
+    bulk = isinstance(data, list)
+    if bulk and not data:
+        return json_response({"error": "empty batch"}, 400)
+    items = data if bulk else [data or {}]
+
+    buf = io.StringIO()
+    buf.write("INSERT DATA {\n")
+    uris = []
+    for index, item in enumerate(items):
+        uri, error = write_station_triples(buf, item)
+        if error:
+            body = {"error": error, "index": index} if bulk else {"error": error}
+            return json_response(body, 400)
+        uris.append(uri)
+    buf.write("}")
+    update_query = buf.getvalue()
 
-    update_query = "INSERT DATA { \n" + "\n".join(triples) + "\n }"
     try:
         headers = {"Content-Type": "application/sparql-update"}
-        resp = requests.post(FUSEKI_UPDATE, data=update_query.encode('utf-8'), headers=headers, timeout=10)
+        resp = SESSION.post(FUSEKI_UPDATE, data=update_query.encode('utf-8'), headers=headers, timeout=FUSEKI_TIMEOUT)
         resp.raise_for_status()
-        return jsonify({"ok": True, "uri": uri}), 201
+        invalidate_query_cache()
+        if bulk:
+            return json_response({"ok": True, "uris": uris}, 201)
+        return json_response({"ok": True, "uri": uris[0]}, 201)
     except Exception as e:
-        return jsonify({"error": f"Fuseki update failed: {e}"}), 500
+        return json_response({"error": f"Fuseki update failed: {e}"}, 500)
 
 @router.route('/<path:localname>', methods=['PUT'])
 def update_parking_station(localname):
@@ -195,49 +437,60 @@ def update_parking_station(localname):
     PUT /api/parking-stations/<localname>
     Update parking station (typically available spaces)
     """
-    data = request.get_json() or {}
+    if not safe_localname(localname):
+        return json_response({"error": "invalid localname"}, 400)
+    try:
+        data = read_json_body() or {}
+    except ValueError:
+        return json_response({"error": "invalid JSON body"}, 400)
+    if not isinstance(data, dict):
+        return json_response({"error": "body must be a JSON object"}, 400)
     available_spaces = data.get("availableSpaces")
 
     if available_spaces is None:
-        return jsonify({"error": "availableSpaces required"}), 400
+        return json_response({"error": "availableSpaces required"}, 400)
+    try:
+        available_spaces = int(available_spaces)
+    except (ValueError, TypeError):
+        return json_response({"error": "availableSpaces must be a number"}, 400)
 
-    base_uri = "http://www.semanticweb.org/monpc/ontologies/2025/9/untitled-ontology-4#"
-    uri = base_uri + localname
+    uri = NS + localname
 
-    # Delete old value and insert new one
+    # Two operations in one request: Fuseki applies them as a single transaction.
+    # DELETE WHERE probes the ground subject directly, INSERT DATA needs no pattern matching.
     update_query = f"""
-    PREFIX sc: <{base_uri}>
-
-    DELETE {{
-      <{uri}> sc:hasAvailableSpaces ?oldSpaces .
-    }}
-    INSERT {{
-      <{uri}> sc:hasAvailableSpaces "{available_spaces}"^^<http://www.w3.org/2001/XMLSchema#integer> .
-    }}
-    WHERE {{
-      OPTIONAL {{ <{uri}> sc:hasAvailableSpaces ?oldSpaces . }}
+    DELETE WHERE {{
+      <{uri}> {HAS_AVAILABLE_SPACES_IRI} ?oldSpaces .
+    }} ;
+    INSERT DATA {{
+      <{uri}> {HAS_AVAILABLE_SPACES_IRI} "{available_spaces}"^^{XSD_INTEGER_IRI} .
     }}
     """
 
     try:
         headers = {"Content-Type": "application/sparql-update"}
-        resp = requests.post(FUSEKI_UPDATE, data=update_query.encode('utf-8'), headers=headers, timeout=10)
+        resp = SESSION.post(FUSEKI_UPDATE, data=update_query.encode('utf-8'), headers=headers, timeout=FUSEKI_TIMEOUT)
         if resp.status_code in (200, 201, 204):
-            return jsonify({"ok": True, "uri": uri, "availableSpaces": available_spaces})
+            invalidate_query_cache()
+            return json_response({"ok": True, "uri": uri, "availableSpaces": available_spaces})
         else:
-            return jsonify({"error": "Fuseki update failed", "status": resp.status_code}), 500
+            return json_response({"error": "Fuseki update failed", "status": resp.status_code}, 500)
     except Exception as e:
-        return jsonify({"error": f"Update error: {str(e)}"}), 500
+        return json_response({"error": f"Update error: {str(e)}"}, 500)
 
 
 @router.route('/<path:localname>', methods=['DELETE'])
 def delete_parking_station(localname):
     """
     DELETE /api/parking-stations/<localname>
-    Remove a parking station from the ontology
+    Remove a parking station from the ontology.
+    The delete runs in the background and the request returns 202 Accepted.
+    The station reads as 404 while the delete is pending; if the delete fails, it is
+    logged and GET returns the station again with a "deleteError" field.
     """
-    base_uri = "http://www.semanticweb.org/monpc/ontologies/2025/9/untitled-ontology-4#"
-    uri = base_uri + localname
+    if not safe_localname(localname):
+        return json_response({"error": "invalid localname"}, 400)
+    uri = NS + localname
 
     update_query = f"""
     DELETE WHERE {{
@@ -245,12 +498,11 @@ def delete_parking_station(localname):
     }}
     """
 
-    try:
-        headers = {"Content-Type": "application/sparql-update"}
-        resp = requests.post(FUSEKI_UPDATE, data=update_query.encode('utf-8'), headers=headers, timeout=10)
-        if resp.status_code in (200, 201, 204):
-            return jsonify({"ok": True, "message": "Parking station deleted"})
-        else:
-            return jsonify({"error": "Fuseki delete failed", "status": resp.status_code}), 500
-    except Exception as e:
-        return jsonify({"error": f"Delete error: {str(e)}"}), 500
\ No newline at end of file
+    # Fuseki work happens in the background; GET treats the station as gone meanwhile
+    future = EXEC.submit(_do_fuseki_update, update_query)
+    with _pending_deletes_lock:
+        _pending_deletes[uri] = future
+        _failed_deletes.pop(uri, None)
+    future.add_done_callback(partial(_finish_delete, uri))
+
+    return json_response({"ok": True, "pending": True, "uri": uri}, 202)
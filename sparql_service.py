@@ -3,40 +3,28 @@ Enhanced SPARQL service infrastructure with validation, timeout, and error handl
 Extends the existing execute_sparql_query function with additional features.
 """
 
+import atexit
+import copy
+import csv
+import io
 import re
+import threading
 import time
 import logging
-from typing import Dict, Any, Optional, List, Union
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Any, Optional, List, Tuple, Union
 from dataclasses import dataclass
 from enum import Enum
-try:
-    from SPARQLWrapper import SPARQLWrapper, JSON, POST, DIGEST
-    from SPARQLWrapper.SPARQLExceptions import SPARQLWrapperException, QueryBadFormed, EndPointNotFound
-except ImportError:
-    # Fallback for testing without SPARQLWrapper
-    class SPARQLWrapper:
-        def __init__(self, endpoint): pass
-        def setQuery(self, query): pass
-        def setReturnFormat(self, format): pass
-        def setTimeout(self, timeout): pass
-        def query(self): 
-            class MockResult:
-                def convert(self): return {"results": {"bindings": []}}
-            return MockResult()
-    
-    class SPARQLWrapperException(Exception): pass
-    class QueryBadFormed(Exception): pass
-    class EndPointNotFound(Exception): pass
-    JSON = "json"
-    POST = "post"
-    DIGEST = "digest"
 import requests
+from requests.adapters import HTTPAdapter
+from cachetools import TTLCache
 from urllib.parse import urlparse
 from rdflib import Graph
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Library-style logging: the application decides levels and handlers
 logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
 
 class QueryType(Enum):
     """SPARQL query types"""
@@ -58,12 +46,12 @@ class QueryResult:
     query_type: Optional[QueryType] = None
     bindings_count: Optional[int] = None
 
-@dataclass
+@dataclass(frozen=True)
 class ValidationResult:
-    """Query validation result"""
+    """Query validation result (immutable so it can be shared from the validation cache)"""
     is_valid: bool
     error_message: Optional[str] = None
-    suggestions: Optional[List[str]] = None
+    suggestions: Optional[Tuple[str, ...]] = None
     query_type: Optional[QueryType] = None
 
 @dataclass
@@ -75,6 +63,232 @@ class ConnectionStatus:
     error: Optional[str] = None
     last_checked: Optional[float] = None
 
+# Regex patterns for query validation, compiled once at import time
+# One alternation over every keyword of interest: a single finditer pass
+# replaces the separate per-keyword scans
+_KEYWORD_RE = re.compile(
+    r'\b(PREFIX|FILTER|OPTIONAL|UNION|WHERE|SELECT|CONSTRUCT|ASK|DESCRIBE|INSERT|DELETE)\b',
+    re.IGNORECASE
+)
+_COMMENT_RE = re.compile(r'#[^\n]*')
+# Single sanitize pass: a run of whitespace and/or comments collapses to one space,
+# a stray null byte is dropped
+_SANITIZE_RE = re.compile(r'(?:[\s\x00]*#[^\n]*)+[\s\x00]*|[\s\x00]+')
+
+def _sanitize_sub(match: re.Match) -> str:
+    return ' ' if match.group().strip('\x00') else ''
+
+# One-pass escaping for values placed inside double-quoted SPARQL literals
+_SPARQL_LITERAL_TABLE = str.maketrans({'\\': '\\\\', '"': '\\"', '\n': '\\n', '\r': '\\r', '\t': '\\t'})
+
+def escape_sparql_literal(value: Any) -> str:
+    """Escape a value for use inside a double-quoted SPARQL string literal."""
+    return str(value).translate(_SPARQL_LITERAL_TABLE)
+
+# Tokens for cache-key canonicalization: IRIs and string literals are kept verbatim,
+# whitespace/comment runs collapse, everything else is scanned for prefixed names
+_CANON_TOKEN_RE = re.compile(
+    r'(<[^<>"{}|^`\\\s]*>)'
+    r'|("(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\')'
+    r'|((?:\s|#[^\n]*)+)'
+    r'|([^<"\'#\s]+|.)',
+    re.DOTALL
+)
+_PREFIX_LABEL_RE = re.compile(r'([A-Za-z][\w\-.]*)?:$')
+_PNAME_RE = re.compile(r'(?<![\w?$:])([A-Za-z][\w\-.]*)?:([\w\-]*)')
+_CANON_PUNCTUATION = frozenset('{}(),;')
+
+@lru_cache(maxsize=1024)
+def _canonical_query_key(query: str) -> str:
+    """
+    Canonical form of a query, used only as a result-cache key (the original text is executed).
+    PREFIX declarations are dropped and their prefixed names expanded to full IRIs, comments
+    are removed and whitespace is normalized (and dropped around braces, parentheses, commas
+    and semicolons). Variables are not renamed: the cached bindings carry the variable names.
+    """
+    tokens = []
+    prefixes = {}
+    prefix_start = None  # index in tokens of a PREFIX keyword awaiting its label and IRI
+    prefix_label = None
+    for iri, literal, space, other in _CANON_TOKEN_RE.findall(query):
+        if space:
+            tokens.append(' ')
+        elif iri:
+            if prefix_label is not None:
+                prefixes[prefix_label] = iri[1:-1]
+                del tokens[prefix_start:]
+                prefix_start = prefix_label = None
+            else:
+                tokens.append(iri)
+        elif literal:
+            prefix_start = prefix_label = None
+            tokens.append(literal)
+        elif other.upper() == 'PREFIX':
+            prefix_start, prefix_label = len(tokens), None
+            tokens.append(other)
+        elif prefix_start is not None and prefix_label is None and _PREFIX_LABEL_RE.match(other):
+            prefix_label = other[:-1]
+            tokens.append(other)
+        else:
+            prefix_start = prefix_label = None
+            if prefixes and ':' in other:
+                other = _PNAME_RE.sub(
+                    lambda m: f'<{prefixes[m.group(1) or ""]}{m.group(2)}>'
+                    if (m.group(1) or "") in prefixes else m.group(0),
+                    other
+                )
+            tokens.append(other)
+
+    # Drop spaces at the ends, doubled, or next to punctuation
+    canonical = []
+    for i, token in enumerate(tokens):
+        if token == ' ':
+            prev = canonical[-1] if canonical else None
+            nxt = tokens[i + 1] if i + 1 < len(tokens) else None
+            if (prev is None or nxt is None or prev == ' ' or nxt == ' '
+                    or prev[-1] in _CANON_PUNCTUATION or nxt[0] in _CANON_PUNCTUATION):
+                continue
+        canonical.append(token)
+    return ''.join(canonical)
+
+_QUERY_HEADERS = {
+    'Content-Type': 'application/sparql-query',
+    # JSON-LD is what Fuseki can offer for CONSTRUCT/DESCRIBE
+    'Accept': 'application/sparql-results+json, application/ld+json;q=0.9',
+}
+
+_TSV_QUERY_HEADERS = {
+    'Content-Type': 'application/sparql-query',
+    'Accept': 'text/tab-separated-values',
+}
+
+_TSV_ESCAPE_RE = re.compile(r'\\(.)')
+_TSV_ESCAPES = {'t': '\t', 'n': '\n', 'r': '\r', 'b': '\b', 'f': '\f', '"': '"', "'": "'", '\\': '\\'}
+
+def _tsv_term(cell: str) -> Optional[str]:
+    """Decode one SPARQL TSV cell to its plain value: IRI without <>, literal lexical form, None if unbound."""
+    if not cell:
+        return None
+    if cell[0] == '<' and cell[-1] == '>':
+        return cell[1:-1]
+    if cell[0] == '"':
+        lexical = cell[1:cell.rindex('"')]
+        if '\\' in lexical:
+            lexical = _TSV_ESCAPE_RE.sub(lambda m: _TSV_ESCAPES.get(m.group(1), m.group(1)), lexical)
+        return lexical
+    # Abbreviated numbers/booleans and blank nodes are written as-is
+    return cell
+
+def _parse_tsv_results(text: str) -> Dict[str, Any]:
+    """Parse a SPARQL TSV result set into {"head": {"vars": [...]}, "rows": [tuple, ...]}."""
+    reader = csv.reader(io.StringIO(text), delimiter='\t', quoting=csv.QUOTE_NONE)
+    header = next(reader, [])
+    return {
+        "head": {"vars": [var.lstrip('?$') for var in header]},
+        "rows": [tuple(_tsv_term(cell) for cell in row) for row in reader if row],
+    }
+
+# Read-only query types whose results may be served from the result cache
+_CACHEABLE_QUERY_TYPES = frozenset((
+    QueryType.SELECT,
+    QueryType.CONSTRUCT,
+    QueryType.ASK,
+    QueryType.DESCRIBE,
+))
+
+# Query type keywords in order of precedence
+_QUERY_TYPE_PRECEDENCE = (
+    QueryType.SELECT,
+    QueryType.CONSTRUCT,
+    QueryType.ASK,
+    QueryType.DESCRIBE,
+    QueryType.INSERT,
+    QueryType.DELETE,
+)
+
+# Common SPARQL injection patterns to detect
+# (one alternation, so the query is scanned once)
+_INJECTION_RE = re.compile(
+    r';\s*(?:DROP|DELETE|INSERT)\b|\bUNION\s+SELECT\b.*--',
+    re.IGNORECASE
+)
+
+def _keyword_counts(query: str) -> Counter:
+    """Count SPARQL keyword occurrences (upper-cased) in a single regex pass."""
+    return Counter(m.group(1).upper() for m in _KEYWORD_RE.finditer(query))
+
+@lru_cache(maxsize=1024)
+def _brace_counts(query: str) -> Tuple[int, int]:
+    """Return (open, close) brace counts, shared by validation and complexity estimation."""
+    return query.count('{'), query.count('}')
+
+@lru_cache(maxsize=1024)
+def _detect_query_type(query: str) -> Optional[QueryType]:
+    """Query type from its keywords (comments ignored), or None if there is none."""
+    keywords = _keyword_counts(_COMMENT_RE.sub('', query))
+    return next((qt for qt in _QUERY_TYPE_PRECEDENCE if qt.value in keywords), None)
+
+@lru_cache(maxsize=1024)
+def _validate_query_syntax_cached(query: str) -> ValidationResult:
+    """Validate a SPARQL query string. Memoized: the result depends only on the query text."""
+    if not query or not query.strip():
+        return ValidationResult(
+            is_valid=False,
+            error_message="Query cannot be empty",
+            suggestions=("Provide a valid SPARQL query",)
+        )
+
+    query = query.strip()
+
+    # Detect query type - look for keywords anywhere in query (after prefixes)
+    # Comments are removed first so keywords inside them are ignored
+    keywords = _keyword_counts(_COMMENT_RE.sub('', query))
+    query_type = next((qt for qt in _QUERY_TYPE_PRECEDENCE if qt.value in keywords), None)
+
+    if not query_type:
+        return ValidationResult(
+            is_valid=False,
+            error_message="Unknown query type. Query must contain SELECT, CONSTRUCT, ASK, DESCRIBE, INSERT, or DELETE",
+            suggestions=(
+                "Include a valid SPARQL query type keyword",
+                "Example: PREFIX ex: <http://example.org/> SELECT ?s ?p ?o WHERE { ?s ?p ?o }"
+            )
+        )
+
+    # Check for potential SPARQL injection
+    if _INJECTION_RE.search(query):
+        return ValidationResult(
+            is_valid=False,
+            error_message="Query contains potentially unsafe patterns",
+            suggestions=("Remove suspicious SQL-like commands", "Use proper SPARQL syntax")
+        )
+
+    # Basic syntax checks
+    suggestions = []
+
+    # Check for balanced braces
+    open_braces, close_braces = _brace_counts(query)
+    if open_braces != close_braces:
+        return ValidationResult(
+            is_valid=False,
+            error_message="Unbalanced braces in query",
+            suggestions=("Check that all { have matching }", "Verify WHERE clause syntax")
+        )
+
+    # Check for WHERE clause in SELECT queries
+    if query_type == QueryType.SELECT and 'WHERE' not in keywords:
+        suggestions.append("Consider adding a WHERE clause for better query structure")
+
+    # Check for missing prefixes
+    if ':' in query and 'PREFIX' not in keywords:
+        suggestions.append("Define PREFIX declarations for namespace shortcuts")
+
+    return ValidationResult(
+        is_valid=True,
+        query_type=query_type,
+        suggestions=tuple(suggestions) if suggestions else None
+    )
+
 class SPARQLQueryService:
     """
     Enhanced SPARQL service with validation, timeout, and error handling capabilities.
@@ -100,40 +314,25 @@ class SPARQLQueryService:
         self.default_timeout = default_timeout
         self.max_retries = max_retries
         
-        # Connection pool settings
+        # Connection pool settings: every query goes through this keep-alive session
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'OntologySearchBackend/1.0'
         })
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=50)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
         
-        # Query validation patterns
-        self._init_validation_patterns()
-        
-        logger.info(f"SPARQLQueryService initialized with endpoint: {fuseki_endpoint}")
-    
-    def _init_validation_patterns(self):
-        """Initialize regex patterns for query validation"""
-        # Updated patterns to allow PREFIX declarations before query type
-        self.query_patterns = {
-            QueryType.SELECT: re.compile(r'\bSELECT\b', re.IGNORECASE),
-            QueryType.CONSTRUCT: re.compile(r'\bCONSTRUCT\b', re.IGNORECASE),
-            QueryType.ASK: re.compile(r'\bASK\b', re.IGNORECASE),
-            QueryType.DESCRIBE: re.compile(r'\bDESCRIBE\b', re.IGNORECASE),
-            QueryType.INSERT: re.compile(r'\bINSERT\b', re.IGNORECASE),
-            QueryType.DELETE: re.compile(r'\bDELETE\b', re.IGNORECASE),
-        }
+        # Opt-in result cache for read-only queries, keyed by the canonical query string
+        self._cache = TTLCache(maxsize=512, ttl=60)
+        self._cache_lock = threading.RLock()
         
-        # Common SPARQL injection patterns to detect
-        self.injection_patterns = [
-            re.compile(r';\s*DROP\s+', re.IGNORECASE),
-            re.compile(r';\s*DELETE\s+', re.IGNORECASE),
-            re.compile(r';\s*INSERT\s+', re.IGNORECASE),
-            re.compile(r'UNION\s+SELECT.*--', re.IGNORECASE),
-        ]
+        logger.info("SPARQLQueryService initialized with endpoint: %s", fuseki_endpoint)
     
     def validate_query_syntax(self, query: str) -> ValidationResult:
         """
         Validate SPARQL query syntax and detect potential issues.
+        Results are memoized per query string (validation is purely syntactic).
         
         Args:
             query: SPARQL query string
@@ -141,81 +340,7 @@ class SPARQLQueryService:
         Returns:
             ValidationResult with validation status and suggestions
         """
-        if not query or not query.strip():
-            return ValidationResult(
-                is_valid=False,
-                error_message="Query cannot be empty",
-                suggestions=["Provide a valid SPARQL query"]
-            )
-        
-        query = query.strip()
-        
-        # Detect query type - look for keywords anywhere in query (after prefixes)
-        query_type = None
-        query_upper = query.upper()
-        
-        # Remove comments and normalize whitespace for better parsing
-        clean_query = re.sub(r'#[^\n]*', '', query_upper)
-        clean_query = re.sub(r'\s+', ' ', clean_query)
-        
-        # Look for query type keywords in order of precedence
-        # Use word boundaries to avoid false matches
-        if re.search(r'\bSELECT\b', clean_query):
-            query_type = QueryType.SELECT
-        elif re.search(r'\bCONSTRUCT\b', clean_query):
-            query_type = QueryType.CONSTRUCT
-        elif re.search(r'\bASK\b', clean_query):
-            query_type = QueryType.ASK
-        elif re.search(r'\bDESCRIBE\b', clean_query):
-            query_type = QueryType.DESCRIBE
-        elif re.search(r'\bINSERT\b', clean_query):
-            query_type = QueryType.INSERT
-        elif re.search(r'\bDELETE\b', clean_query):
-            query_type = QueryType.DELETE
-        
-        if not query_type:
-            return ValidationResult(
-                is_valid=False,
-                error_message="Unknown query type. Query must contain SELECT, CONSTRUCT, ASK, DESCRIBE, INSERT, or DELETE",
-                suggestions=[
-                    "Include a valid SPARQL query type keyword",
-                    "Example: PREFIX ex: <http://example.org/> SELECT ?s ?p ?o WHERE { ?s ?p ?o }"
-                ]
-            )
-        
-        # Check for potential SPARQL injection
-        for pattern in self.injection_patterns:
-            if pattern.search(query):
-                return ValidationResult(
-                    is_valid=False,
-                    error_message="Query contains potentially unsafe patterns",
-                    suggestions=["Remove suspicious SQL-like commands", "Use proper SPARQL syntax"]
-                )
-        
-        # Basic syntax checks
-        suggestions = []
-        
-        # Check for balanced braces
-        if query.count('{') != query.count('}'):
-            return ValidationResult(
-                is_valid=False,
-                error_message="Unbalanced braces in query",
-                suggestions=["Check that all { have matching }", "Verify WHERE clause syntax"]
-            )
-        
-        # Check for WHERE clause in SELECT queries
-        if query_type == QueryType.SELECT and 'WHERE' not in query.upper():
-            suggestions.append("Consider adding a WHERE clause for better query structure")
-        
-        # Check for missing prefixes
-        if ':' in query and 'PREFIX' not in query.upper():
-            suggestions.append("Define PREFIX declarations for namespace shortcuts")
-        
-        return ValidationResult(
-            is_valid=True,
-            query_type=query_type,
-            suggestions=suggestions if suggestions else None
-        )
+        return _validate_query_syntax_cached(query)
     
     def sanitize_query_input(self, query: str) -> str:
         """
@@ -230,21 +355,17 @@ class SPARQLQueryService:
         if not query:
             return ""
         
-        # Remove null bytes
-        query = query.replace('\x00', '')
-        
-        # Normalize whitespace
-        query = re.sub(r'\s+', ' ', query.strip())
-        
-        # Remove comments that could hide malicious code
-        query = re.sub(r'#[^\n]*', '', query)
-        
-        return query
+        # Remove null bytes, normalize whitespace and remove comments that could
+        # hide malicious code, in one pass
+        return _SANITIZE_RE.sub(_sanitize_sub, query).strip(' ')
     
     def execute_query_with_validation(self, 
                                     query: str, 
                                     timeout: Optional[int] = None,
-                                    validate: bool = True) -> QueryResult:
+                                    validate: bool = True,
+                                    return_format: str = "json",
+                                    sanitize: bool = True,
+                                    cache: bool = False) -> QueryResult:
         """
         Execute SPARQL query with validation and enhanced error handling.
         
@@ -252,6 +373,13 @@ class SPARQLQueryService:
             query: SPARQL query string
             timeout: Query timeout in seconds (uses default if None)
             validate: Whether to validate query before execution
+            return_format: "json" for standard SPARQL JSON results, or "tsv" for SELECT
+                queries to get {"head": {"vars": [...]}, "rows": [tuple, ...]} with plain
+                string cells (IRIs and literal values, None when unbound)
+            sanitize: Whether to sanitize the query first; pass False (with validate=False)
+                for trusted queries built server-side
+            cache: Whether a read-only query may be served from (and stored in) the result
+                cache; only for callers that call invalidate_cache() after their own writes
             
         Returns:
             QueryResult with execution results and metadata
@@ -259,9 +387,11 @@ class SPARQLQueryService:
         start_time = time.time()
         
         # Sanitize input
-        query = self.sanitize_query_input(query)
+        if sanitize:
+            query = self.sanitize_query_input(query)
         
         # Validate query if requested
+        query_type = None
         if validate:
             validation = self.validate_query_syntax(query)
             if not validation.is_valid:
@@ -270,41 +400,67 @@ class SPARQLQueryService:
                     error=f"Query validation failed: {validation.error_message}",
                     execution_time=time.time() - start_time
                 )
+            query_type = validation.query_type
         
         # Use provided timeout or default
         query_timeout = timeout or self.default_timeout
+        if cache and query_type is None:
+            # Trusted path: only the query type is needed to decide cacheability
+            query_type = _detect_query_type(query)
+        cacheable = cache and query_type in _CACHEABLE_QUERY_TYPES
         
         try:
-            return self._execute_with_retry(query, query_timeout, start_time)
+            return self._execute_with_retry(query, query_timeout, start_time, cacheable, return_format)
         except Exception as e:
-            logger.error(f"Query execution failed: {str(e)}")
+            logger.error("Query execution failed: %s", e)
             return QueryResult(
                 success=False,
                 error=f"Query execution error: {str(e)}",
                 execution_time=time.time() - start_time
             )
     
-    def _execute_with_retry(self, query: str, timeout: int, start_time: float) -> QueryResult:
-        """Execute query with retry logic"""
+    def invalidate_cache(self):
+        """Drop all cached query results (call after any update to the dataset)."""
+        with self._cache_lock:
+            self._cache.clear()
+    
+    def _execute_with_retry(self, query: str, timeout: int, start_time: float,
+                            cacheable: bool = False, return_format: str = "json") -> QueryResult:
+        """Execute query with retry logic, serving read-only queries from the result cache"""
+        cache_key = None
+        if cacheable:
+            cache_key = (return_format, _canonical_query_key(query))
+            with self._cache_lock:
+                cached = self._cache.get(cache_key)
+            if cached is not None:
+                results, bindings_count = cached
+                return QueryResult(
+                    success=True,
+                    data=copy.deepcopy(results),
+                    execution_time=time.time() - start_time,
+                    bindings_count=bindings_count
+                )
+        
         last_error = None
         
         for attempt in range(self.max_retries):
             try:
-                sparql = SPARQLWrapper(self.fuseki_endpoint)
-                sparql.setQuery(query)
-                sparql.setReturnFormat(JSON)
-                sparql.setTimeout(timeout)
-                
                 # Execute query
-                results = sparql.query().convert()
+                results = self._post_query(query, timeout, return_format)
                 execution_time = time.time() - start_time
                 
                 # Count bindings if available
                 bindings_count = None
                 if 'results' in results and 'bindings' in results['results']:
                     bindings_count = len(results['results']['bindings'])
+                elif 'rows' in results:
+                    bindings_count = len(results['rows'])
+                
+                logger.info("Query executed successfully in %.3fs, %s results", execution_time, bindings_count)
                 
-                logger.info(f"Query executed successfully in {execution_time:.3f}s, {bindings_count} results")
+                if cacheable:
+                    with self._cache_lock:
+                        self._cache[cache_key] = (copy.deepcopy(results), bindings_count)
                 
                 return QueryResult(
                     success=True,
@@ -313,16 +469,25 @@ class SPARQLQueryService:
                     bindings_count=bindings_count
                 )
                 
-            except SPARQLWrapperException as e:
+            except requests.HTTPError as e:
+                last_error = f"SPARQL error: {str(e)}"
+                logger.warning("Attempt %d failed: %s", attempt + 1, last_error)
+                
+                if e.response is not None and e.response.status_code < 500:
+                    break  # Malformed query: retrying will not help
+                if attempt < self.max_retries - 1:
+                    time.sleep(0.5 * (attempt + 1))  # Exponential backoff
+                    
+            except requests.RequestException as e:
                 last_error = f"SPARQL error: {str(e)}"
-                logger.warning(f"Attempt {attempt + 1} failed: {last_error}")
+                logger.warning("Attempt %d failed: %s", attempt + 1, last_error)
                 
                 if attempt < self.max_retries - 1:
                     time.sleep(0.5 * (attempt + 1))  # Exponential backoff
                     
             except Exception as e:
                 last_error = f"Unexpected error: {str(e)}"
-                logger.error(f"Attempt {attempt + 1} failed: {last_error}")
+                logger.error("Attempt %d failed: %s", attempt + 1, last_error)
                 break  # Don't retry on unexpected errors
         
         return QueryResult(
@@ -331,6 +496,19 @@ class SPARQLQueryService:
             execution_time=time.time() - start_time
         )
     
+    def _post_query(self, query: str, timeout: int, return_format: str = "json") -> Dict[str, Any]:
+        """POST a query to the Fuseki endpoint over the pooled session and decode the results"""
+        resp = self.session.post(
+            self.fuseki_endpoint,
+            data=query.encode('utf-8'),
+            headers=_TSV_QUERY_HEADERS if return_format == "tsv" else _QUERY_HEADERS,
+            timeout=timeout
+        )
+        resp.raise_for_status()
+        if return_format == "tsv":
+            return _parse_tsv_results(resp.text)
+        return resp.json()
+    
     def execute_with_timeout(self, query: str, timeout: int) -> QueryResult:
         """
         Execute query with specific timeout.
@@ -357,12 +535,7 @@ class SPARQLQueryService:
             # Simple ASK query to test connectivity
             test_query = "ASK { ?s ?p ?o }"
             
-            sparql = SPARQLWrapper(self.fuseki_endpoint)
-            sparql.setQuery(test_query)
-            sparql.setReturnFormat(JSON)
-            sparql.setTimeout(5)  # Short timeout for connection test
-            
-            results = sparql.query().convert()
+            self._post_query(test_query, 5)  # Short timeout for connection test
             response_time = time.time() - start_time
             
             return ConnectionStatus(
@@ -390,42 +563,54 @@ class SPARQLQueryService:
         Returns:
             Dictionary with query statistics
         """
-        validation = self.validate_query_syntax(query)
-        
-        stats = {
-            'query_length': len(query),
-            'line_count': len(query.split('\n')),
-            'query_type': validation.query_type.value if validation.query_type else None,
-            'is_valid': validation.is_valid,
-            'has_prefixes': 'PREFIX' in query.upper(),
-            'has_filter': 'FILTER' in query.upper(),
-            'has_optional': 'OPTIONAL' in query.upper(),
-            'has_union': 'UNION' in query.upper(),
-            'estimated_complexity': self._estimate_complexity(query)
-        }
-        
-        return stats
+        return dict(_query_statistics_cached(query))
     
     def _estimate_complexity(self, query: str) -> str:
         """Estimate query complexity based on patterns"""
-        complexity_score = 0
-        
-        # Count complex patterns
-        if 'UNION' in query.upper():
-            complexity_score += 2
-        if 'OPTIONAL' in query.upper():
-            complexity_score += 1
-        if 'FILTER' in query.upper():
-            complexity_score += 1
-        if query.count('{') > 2:  # Nested patterns
-            complexity_score += 1
-        
-        if complexity_score == 0:
-            return "simple"
-        elif complexity_score <= 2:
-            return "moderate"
-        else:
-            return "complex"
+        return _estimate_complexity(query)
+
+@lru_cache(maxsize=1024)
+def _query_statistics_cached(query: str) -> Dict[str, Any]:
+    """Memoized query statistics; callers receive a copy of the cached dict."""
+    validation = _validate_query_syntax_cached(query)
+    counts = _keyword_counts(query)
+    
+    stats = {
+        'query_length': len(query),
+        'line_count': len(query.split('\n')),
+        'query_type': validation.query_type.value if validation.query_type else None,
+        'is_valid': validation.is_valid,
+        'has_prefixes': 'PREFIX' in counts,
+        'has_filter': 'FILTER' in counts,
+        'has_optional': 'OPTIONAL' in counts,
+        'has_union': 'UNION' in counts,
+        'estimated_complexity': _estimate_complexity(query, counts)
+    }
+    
+    return stats
+
+def _estimate_complexity(query: str, counts: Optional[Counter] = None) -> str:
+    """Estimate query complexity based on patterns"""
+    if counts is None:
+        counts = _keyword_counts(query)
+    complexity_score = 0
+    
+    # Count complex patterns
+    if 'UNION' in counts:
+        complexity_score += 2
+    if 'OPTIONAL' in counts:
+        complexity_score += 1
+    if 'FILTER' in counts:
+        complexity_score += 1
+    if _brace_counts(query)[0] > 2:  # Nested patterns
+        complexity_score += 1
+    
+    if complexity_score == 0:
+        return "simple"
+    elif complexity_score <= 2:
+        return "moderate"
+    else:
+        return "complex"
 
 # Backward compatibility: extend existing execute_sparql_query function
 def execute_sparql_query(query: str, 
@@ -443,13 +628,13 @@ def execute_sparql_query(query: str,
     Returns:
         Query results dictionary or None on error
     """
-    service = SPARQLQueryService(fuseki_endpoint=endpoint)
+    service = get_sparql_service(endpoint)
     result = service.execute_query_with_validation(query, timeout=timeout)
     
     if result.success:
         return result.data
     else:
-        logger.error(f"Query failed: {result.error}")
+        logger.error("Query failed: %s", result.error)
         return None
 
 # Service SPARQL minimal basé sur rdflib pour usage local / tests.
@@ -479,12 +664,13 @@ def get_sparql_service():
 
     return SparqlService(g)
 
-# Global service instance for easy access
-_default_service = None
+# Service instances for easy access, one per endpoint so each keeps its own session pool
+_services: Dict[str, SPARQLQueryService] = {}
+_services_lock = threading.Lock()
 
 def get_sparql_service(endpoint: str = "http://localhost:3030/smartcity/query") -> SPARQLQueryService:
     """
-    Get or create a default SPARQL service instance.
+    Get or create the shared SPARQL service instance for an endpoint.
     
     Args:
         endpoint: SPARQL endpoint URL
@@ -492,9 +678,19 @@ def get_sparql_service(endpoint: str = "http://localhost:3030/smartcity/query")
     Returns:
         SPARQLQueryService instance
     """
-    global _default_service
-    
-    if _default_service is None or _default_service.fuseki_endpoint != endpoint:
-        _default_service = SPARQLQueryService(fuseki_endpoint=endpoint)
+    service = _services.get(endpoint)
+    if service is not None:
+        return service
     
-    return _default_service
\ No newline at end of file
+    with _services_lock:
+        service = _services.get(endpoint)
+        if service is None:
+            service = _services[endpoint] = SPARQLQueryService(fuseki_endpoint=endpoint)
+        return service
+
+@atexit.register
+def _close_services():
+    """Close the pooled HTTP sessions of every shared service on interpreter exit."""
+    with _services_lock:
+        for service in _services.values():
+            service.session.close()
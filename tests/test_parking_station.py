@@ -0,0 +1,207 @@
+import threading
+
+import orjson
+import pytest
+from flask import Flask
+
+import parking_station.routes as routes
+from parking_station.routes import FIELDS, NS, stations_from_bindings
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, payload=None):
+        self.status_code = status_code
+        self.content = orjson.dumps(payload or {})
+        self.text = self.content.decode()
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+
+class FakeSession:
+    """Stands in for the pooled Fuseki session: records bodies, answers SELECTs with select_payload"""
+
+    def __init__(self):
+        self.updates = []
+        self.queries = []
+        self.select_payload = {"results": {"bindings": []}}
+        self.update_status = 204
+
+    def post(self, url, data=None, headers=None, timeout=None):
+        body = data.decode("utf-8")
+        if url == routes.FUSEKI_UPDATE:
+            self.updates.append(body)
+            return FakeResponse(self.update_status)
+        self.queries.append(body)
+        return FakeResponse(payload=self.select_payload)
+
+
+@pytest.fixture
+def session(monkeypatch):
+    session = FakeSession()
+    monkeypatch.setattr(routes, "SESSION", session)
+    routes.invalidate_query_cache()
+    routes._pending_deletes.clear()
+    routes._failed_deletes.clear()
+    return session
+
+
+@pytest.fixture
+def client(session):
+    app = Flask(__name__)
+    app.register_blueprint(routes.router, url_prefix="/api/parking-stations")
+    return app.test_client()
+
+
+def uri_term(value):
+    return {"type": "uri", "value": value}
+
+
+def literal_term(value):
+    return {"type": "literal", "value": value}
+
+
+def test_stations_from_bindings_pivots_properties_in_row_order():
+    bindings = [
+        {"station": uri_term(NS + "P2"), "type": uri_term(NS + "CarParkingStation"),
+         "p": uri_term(NS + "hasName"), "val": literal_term("Alpha")},
+        {"station": uri_term(NS + "P2"), "type": uri_term(NS + "CarParkingStation"),
+         "p": uri_term(NS + "hasCapacity"), "val": literal_term("120")},
+        {"station": uri_term(NS + "P1"), "type": uri_term(NS + "BikeParkingStation")},
+        {"station": uri_term(NS + "P1"), "type": uri_term(NS + "BikeParkingStation"),
+         "p": uri_term(NS + "unknownProperty"), "val": literal_term("ignored")},
+    ]
+
+    stations = stations_from_bindings(bindings)
+
+    assert [s["uri"] for s in stations] == [NS + "P2", NS + "P1"]
+    assert stations[0]["type"] == NS + "CarParkingStation"
+    assert stations[0]["name"] == "Alpha"
+    assert stations[0]["capacity"] == "120"
+    assert stations[0]["availableSpaces"] is None
+    assert stations[1] == {"uri": NS + "P1", **dict.fromkeys(FIELDS), "type": NS + "BikeParkingStation"}
+
+
+def test_stations_from_bindings_without_rows():
+    assert stations_from_bindings([]) == []
+
+
+def test_bulk_create_writes_one_insert(client, session):
+    resp = client.post("/api/parking-stations/", json=[
+        {"localname": "P1", "type": "CarParkingStation", "name": 'Gare "Nord"', "capacity": 10},
+        {"localname": "P2", "type": "EVChargingStation"},
+    ])
+
+    assert resp.status_code == 201
+    assert resp.get_json() == {"ok": True, "uris": [NS + "P1", NS + "P2"]}
+    assert len(session.updates) == 1
+    assert f'<{NS}P1> <{NS}hasName> "Gare \\"Nord\\"" .' in session.updates[0]
+    assert f"<{NS}P2> a <{NS}EVChargingStation> ." in session.updates[0]
+
+
+def test_bulk_create_rejects_the_whole_batch_on_an_invalid_item(client, session):
+    resp = client.post("/api/parking-stations/", json=[
+        {"localname": "P1", "type": "CarParkingStation"},
+        {"localname": "bad name", "type": "CarParkingStation"},
+    ])
+
+    assert resp.status_code == 400
+    assert resp.get_json() == {"error": "invalid localname", "index": 1}
+    assert session.updates == []
+
+
+def test_bulk_create_rejects_an_empty_batch(client, session):
+    resp = client.post("/api/parking-stations/", json=[])
+
+    assert resp.status_code == 400
+    assert resp.get_json() == {"error": "empty batch"}
+    assert session.updates == []
+
+
+def station_rows(*localnames):
+    return {"results": {"bindings": [
+        {"station": uri_term(NS + name), "type": uri_term(NS + "CarParkingStation")} for name in localnames
+    ]}}
+
+
+def test_list_links_the_next_page_when_full(client, session):
+    session.select_payload = station_rows("P1", "P2")
+
+    resp = client.get("/api/parking-stations/?type=CarParkingStation&limit=2&offset=4")
+
+    assert resp.status_code == 200
+    assert [s["uri"] for s in resp.get_json()["stations"]] == [NS + "P1", NS + "P2"]
+    assert "LIMIT 2 OFFSET 4" in session.queries[0]
+    assert resp.headers["Link"] == (
+        '<http://localhost/api/parking-stations/?type=CarParkingStation&limit=2&offset=6>; rel="next"'
+    )
+
+
+def test_list_last_page_has_no_link(client, session):
+    session.select_payload = station_rows("P1")
+
+    resp = client.get("/api/parking-stations/?limit=2")
+
+    assert len(resp.get_json()["stations"]) == 1
+    assert "Link" not in resp.headers
+
+
+@pytest.mark.parametrize("query", ["limit=0", "limit=-5", "limit=abc", "offset=x", "offset=-1", "type=Garage"])
+def test_list_rejects_bad_parameters(client, session, query):
+    assert client.get(f"/api/parking-stations/?{query}").status_code == 400
+    assert session.queries == []
+
+
+def delete_and_wait(client, session, localname):
+    """DELETE a station, check it reads as gone while pending, then let the update finish"""
+    session.release = threading.Event()
+    post = session.post
+
+    def blocking_post(url, data=None, headers=None, timeout=None):
+        if url == routes.FUSEKI_UPDATE:
+            assert session.release.wait(5)
+        return post(url, data=data, headers=headers, timeout=timeout)
+
+    session.post = blocking_post
+    resp = client.delete(f"/api/parking-stations/{localname}")
+    assert resp.status_code == 202
+    assert resp.get_json() == {"ok": True, "pending": True, "uri": NS + localname}
+
+    # Done callbacks run in registration order: once this one fires, _finish_delete has run
+    finished = threading.Event()
+    routes._pending_deletes[NS + localname].add_done_callback(lambda future: finished.set())
+    assert client.get(f"/api/parking-stations/{localname}").status_code == 404
+    session.release.set()
+    assert finished.wait(5)
+    session.post = post
+
+
+def test_delete_runs_in_the_background(client, session):
+    delete_and_wait(client, session, "P1")
+
+    assert len(session.updates) == 1
+    assert "DELETE WHERE" in session.updates[0] and f"<{NS}P1> ?p ?o ." in session.updates[0]
+    assert not routes.is_delete_pending(NS + "P1")
+    assert routes.failed_delete_error(NS + "P1") is None
+
+
+def test_failed_delete_is_reported_on_get(client, session):
+    session.update_status = 500
+    delete_and_wait(client, session, "P1")
+    session.select_payload = station_rows("P1")
+
+    resp = client.get("/api/parking-stations/P1")
+
+    assert resp.status_code == 200
+    assert resp.get_json()["deleteError"] == "HTTP 500"
+
+    # Retrying the delete clears the recorded failure
+    session.update_status = 204
+    delete_and_wait(client, session, "P1")
+    assert "deleteError" not in client.get("/api/parking-stations/P1").get_json()
+
+
+def test_delete_rejects_invalid_localnames(client, session):
+    assert client.delete("/api/parking-stations/a%20b").status_code == 400
+    assert session.updates == []
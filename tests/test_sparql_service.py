@@ -0,0 +1,121 @@
+import pytest
+
+import sparql_service
+from sparql_service import SPARQLQueryService, _canonical_query_key, _parse_tsv_results, escape_sparql_literal
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.payload = payload
+        self.text = ""
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+class FakeSession:
+    """Stands in for the service's requests session and records every posted query"""
+
+    def __init__(self):
+        self.queries = []
+
+    def post(self, url, data=None, headers=None, timeout=None):
+        self.queries.append(data.decode("utf-8"))
+        return FakeResponse({"head": {"vars": ["s"]}, "results": {"bindings": [{"s": {"type": "uri", "value": "x"}}]}})
+
+
+@pytest.fixture
+def service():
+    service = SPARQLQueryService(max_retries=1)
+    service.session = FakeSession()
+    return service
+
+
+def test_canonical_key_expands_prefixes_and_drops_comments():
+    prefixed = "PREFIX ex: <http://example.org/>\nSELECT ?s WHERE { ?s a ex:C } # all C"
+    expanded = "SELECT  ?s\nWHERE {?s a <http://example.org/C>}"
+    assert _canonical_query_key(prefixed) == _canonical_query_key(expanded)
+    assert _canonical_query_key(expanded) == "SELECT ?s WHERE{?s a <http://example.org/C>}"
+
+
+def test_canonical_key_expands_the_empty_prefix():
+    query = "PREFIX : <http://example.org/>\nSELECT ?s WHERE { ?s a :C }"
+    assert _canonical_query_key(query) == "SELECT ?s WHERE{?s a <http://example.org/C>}"
+
+
+def test_canonical_key_keeps_literals_verbatim():
+    query = 'PREFIX ex: <http://example.org/>\nSELECT ?s WHERE { ?s ex:name "ex:C  # not a comment" }'
+    assert '"ex:C  # not a comment"' in _canonical_query_key(query)
+
+
+def test_canonical_key_keeps_variable_names():
+    assert (_canonical_query_key("SELECT ?s WHERE { ?s ?p ?o }")
+            != _canonical_query_key("SELECT ?x WHERE { ?x ?p ?o }"))
+
+
+def test_parse_tsv_results_decodes_terms():
+    text = ('?s\t?name\t?count\n'
+            '<http://example.org/a>\t"Bus \\"A\\"\\tline"@en\t"3"^^<http://www.w3.org/2001/XMLSchema#integer>\n'
+            '_:b0\t\t42\n')
+    assert _parse_tsv_results(text) == {
+        "head": {"vars": ["s", "name", "count"]},
+        "rows": [
+            ("http://example.org/a", 'Bus "A"\tline', "3"),
+            ("_:b0", None, "42"),
+        ],
+    }
+
+
+def test_parse_tsv_results_without_rows():
+    assert _parse_tsv_results("?s\n") == {"head": {"vars": ["s"]}, "rows": []}
+
+
+def test_escape_sparql_literal():
+    assert escape_sparql_literal('say "hi"\\\n\r\t') == 'say \\"hi\\"\\\\\\n\\r\\t'
+    assert escape_sparql_literal(12) == "12"
+
+
+SELECT_ALL = "SELECT ?s WHERE { ?s ?p ?o }"
+
+
+def test_results_are_not_cached_by_default(service, monkeypatch):
+    def fail(query):
+        raise AssertionError("cache key computed")
+    monkeypatch.setattr(sparql_service, "_canonical_query_key", fail)
+
+    assert service.execute_query_with_validation(SELECT_ALL).success
+    assert service.execute_query_with_validation(SELECT_ALL).success
+    assert len(service.session.queries) == 2
+
+
+def test_cache_opt_in_serves_repeat_queries_until_invalidated(service):
+    first = service.execute_query_with_validation(SELECT_ALL, cache=True)
+    second = service.execute_query_with_validation(SELECT_ALL, cache=True)
+    assert len(service.session.queries) == 1
+    assert second.data == first.data and second.bindings_count == 1
+
+    service.invalidate_cache()
+    service.execute_query_with_validation(SELECT_ALL, cache=True)
+    assert len(service.session.queries) == 2
+
+
+def test_cache_opt_in_never_caches_updates(service):
+    update = "INSERT DATA { <http://example.org/a> <http://example.org/p> 1 }"
+    service.execute_query_with_validation(update, cache=True)
+    service.execute_query_with_validation(update, cache=True)
+    assert len(service.session.queries) == 2
+
+
+@pytest.mark.parametrize("cache", [False, True])
+def test_validate_false_skips_the_validator(service, monkeypatch, cache):
+    def fail(query):
+        raise AssertionError("validator called")
+    monkeypatch.setattr(sparql_service, "_validate_query_syntax_cached", fail)
+
+    result = service.execute_query_with_validation(SELECT_ALL, validate=False, sanitize=False, cache=cache)
+    assert result.success
+    service.execute_query_with_validation(SELECT_ALL, validate=False, sanitize=False, cache=cache)
+    assert len(service.session.queries) == (1 if cache else 2)
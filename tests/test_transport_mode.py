@@ -0,0 +1,87 @@
+import pytest
+from flask import Flask
+
+import transport_mode.routes as routes
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.text = ""
+
+
+class UpdateRecorder(list):
+    """Replaces post_update: records INSERT DATA bodies, answers with the queued statuses (default 204)"""
+
+    def __init__(self):
+        super().__init__()
+        self.statuses = []
+
+    def __call__(self, update_query):
+        self.append(update_query)
+        return FakeResponse(self.statuses.pop(0) if self.statuses else 204)
+
+
+@pytest.fixture
+def updates(monkeypatch):
+    recorder = UpdateRecorder()
+    monkeypatch.setattr(routes, "post_update", recorder)
+    return recorder
+
+
+@pytest.fixture
+def invalidations(monkeypatch):
+    calls = []
+    monkeypatch.setattr(routes.sparql_service, "invalidate_cache", lambda: calls.append("results"))
+    monkeypatch.setattr(routes, "invalidate_class_cache", lambda: calls.append("classes"))
+    return calls
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.register_blueprint(routes.router, url_prefix="/api/transport-modes")
+    return app.test_client()
+
+
+def test_bulk_writes_valid_items_in_one_update(client, updates, invalidations):
+    resp = client.post("/api/transport-modes/bulk", json={"items": [
+        {"localname": "BikeX", "name": 'Bike "X"', "speed": 12},
+        {"name": "no uri"},
+        "not an item",
+        {"uri": "http://example.org/BusY", "class": "http://example.org/Bus"},
+    ]})
+
+    assert resp.status_code == 207
+    assert resp.get_json()["results"] == [
+        {"index": 0, "ok": True, "uri": routes.TRANSPORT_MODE_NS + "BikeX"},
+        {"index": 1, "ok": False, "error": "uri or localname required"},
+        {"index": 2, "ok": False, "error": "item must be an object"},
+        {"index": 3, "ok": True, "uri": "http://example.org/BusY"},
+    ]
+    assert len(updates) == 1
+    assert '"Bike \\"X\\""' in updates[0]
+    assert "<http://example.org/BusY> a <http://example.org/Bus> ." in updates[0]
+    assert invalidations == ["results", "classes"]
+
+
+def test_bulk_splits_large_batches_and_reports_failed_chunks(client, updates, invalidations, monkeypatch):
+    monkeypatch.setattr(routes, "MAX_UPDATE_BYTES", 1)
+    updates.statuses = [204, 500]
+
+    resp = client.post("/api/transport-modes/bulk", json={"items": [
+        {"localname": "A"}, {"localname": "B"},
+    ]})
+
+    assert len(updates) == 2
+    assert resp.get_json()["results"] == [
+        {"index": 0, "ok": True, "uri": routes.TRANSPORT_MODE_NS + "A"},
+        {"index": 1, "ok": False, "error": "Fuseki update failed (status 500)"},
+    ]
+    assert invalidations == ["results", "classes"]
+
+
+@pytest.mark.parametrize("body", [{}, {"items": []}, {"items": {"localname": "A"}}])
+def test_bulk_requires_a_non_empty_items_list(client, updates, body):
+    assert client.post("/api/transport-modes/bulk", json=body).status_code == 400
+    assert updates == []
@@ -0,0 +1,198 @@
+import threading
+
+import orjson
+import pytest
+from flask import Flask
+
+import transport_recommendation.routes as routes
+from transport_recommendation.routes import _custom_bonus_by_mode
+from transport_recommendation_service import Recommendation, TransportRecommendationService
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.content = orjson.dumps(payload)
+
+    def raise_for_status(self):
+        pass
+
+
+class BlockingSession:
+    """Fake keep-alive session: every POST blocks until release is set"""
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.queries = []
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def post(self, url, data=None, headers=None, timeout=None):
+        self.queries.append(data["query"])
+        self.entered.set()
+        assert self.release.wait(5)
+        return FakeResponse(self.payload)
+
+
+class CountingInflight(dict):
+    """_inflight dict counting lookups that found a query already running"""
+
+    def __init__(self):
+        super().__init__()
+        self.joined = threading.Semaphore(0)
+
+    def get(self, key, default=None):
+        future = super().get(key, default)
+        if future is not None:
+            self.joined.release()
+        return future
+
+
+@pytest.fixture
+def service():
+    return TransportRecommendationService()
+
+
+def test_custom_bonus_sums_preference_deltas_per_mode():
+    bonus = _custom_bonus_by_mode({"speed": "low", "cost": "low", "environmental": "high"}, {})
+    assert bonus == {"Bike": pytest.approx(0.6)}
+
+
+def test_custom_bonus_adds_the_accessibility_constraint():
+    bonus = _custom_bonus_by_mode({"speed": "high"}, {"accessibility": True})
+    assert bonus == {"Metro": pytest.approx(0.3), "Bus": pytest.approx(0.1)}
+
+
+def test_custom_bonus_ignores_unknown_preferences():
+    assert _custom_bonus_by_mode({"speed": "warp", "comfort": "high"}, {"accessibility": False}) == {}
+
+
+def test_concurrent_identical_queries_share_one_request(service):
+    session = service._session = BlockingSession({"boolean": True})
+    inflight = service._inflight = CountingInflight()
+    results = []
+
+    def ask():
+        results.append(service._run_query("ASK { ?s ?p ?o }"))
+
+    leader = threading.Thread(target=ask)
+    leader.start()
+    assert session.entered.wait(5)
+    followers = [threading.Thread(target=ask) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    for _ in followers:
+        assert inflight.joined.acquire(timeout=5)
+    session.release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+
+    assert session.queries == ["ASK { ?s ?p ?o }"]
+    assert results == [{"boolean": True}] * 4
+    assert not service._inflight
+
+
+def test_failed_query_is_not_kept_in_flight(service):
+    class FailingSession:
+        def post(self, *args, **kwargs):
+            raise ConnectionError("fuseki down")
+
+    service._session = FailingSession()
+    with pytest.raises(ConnectionError):
+        service._run_query("ASK { ?s ?p ?o }")
+    assert not service._inflight
+
+
+NS = "http://www.semanticweb.org/monpc/ontologies/2025/9/untitled-ontology-4#"
+
+
+class RecordingSession:
+    """Fake session answering the stations query and the mode facts query"""
+
+    def __init__(self):
+        self.queries = []
+
+    def post(self, url, data=None, headers=None, timeout=None):
+        query = data["query"]
+        self.queries.append(query)
+        if "?stationType" in query:
+            bindings = [{"transportMode": {"value": NS + "Bus"}, "station": {"value": NS + "S1"},
+                         "stationName": {"value": "Station 1"}}]
+        else:
+            bindings = [{"mode": {"value": NS + "Bus"}, "relationshipCount": {"value": "2"}},
+                        {"mode": {"value": NS + "Bus"}, "speed": {"value": "40"}}]
+        return FakeResponse({"results": {"bindings": bindings}})
+
+
+def test_mode_facts_are_cached_until_reload(service):
+    session = service._session = RecordingSession()
+
+    first = service.get_recommendations_for_user_type("citizen")
+    assert len(session.queries) == 2
+    assert service.get_recommendations_for_user_type("citizen") == first
+    assert service.calculate_relevance_score("citizen", "Bus") == first[0].relevance_score
+    assert len(session.queries) == 3  # single-mode facts for calculate_relevance_score
+
+    bus = next(rec for rec in first if rec.transport_mode == "Bus")
+    assert bus.stations == ["Station 1"]
+    assert bus.relevance_score == pytest.approx(0.8 + 0.1 + 0.1)
+
+    service.reload_cache()
+    service.get_recommendations_for_user_type("citizen")
+    assert len(session.queries) == 5
+
+
+class FakeRecommendationService:
+    """Returns fixed base recommendations and records the user types asked for"""
+
+    def __init__(self):
+        self.user_types = []
+
+    def get_recommendations_for_user_type(self, user_type):
+        self.user_types.append(user_type)
+        return [
+            Recommendation("Metro", ["M1"], 0.9, "Recommended: metro."),
+            Recommendation("Bike", ["B1"], 0.7, "Recommended: bike."),
+        ]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    fake = FakeRecommendationService()
+    monkeypatch.setattr(routes, "recommendation_service", fake)
+    app = Flask(__name__)
+    app.register_blueprint(routes.router, url_prefix="/api")
+    client = app.test_client()
+    client.fake_service = fake
+    return client
+
+
+def test_custom_batch_scores_each_profile(client):
+    resp = client.post("/api/recommendations/custom/batch", json={"profiles": [
+        {"userType": "citizen", "preferences": {"environmental": "high"}},
+        {"userType": "Citizen", "preferences": {"speed": "high"}},
+        "not a profile",
+    ]})
+
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body["total"] == 3
+    first, second, third = body["results"]
+    assert [rec["transportMode"] for rec in first["recommendations"]] == ["Bike", "Metro"]
+    assert first["recommendations"][0]["relevanceScore"] == pytest.approx(1.0)
+    assert first["recommendations"][0]["matchedPreferences"] == ["environmental"]
+    assert second["recommendations"][0]["transportMode"] == "Metro"
+    assert third == {"index": 2, "error": "Profile must be a JSON object"}
+    # Base recommendations are fetched once per user type
+    assert client.fake_service.user_types == ["citizen"]
+
+
+@pytest.mark.parametrize("body", [{}, {"profiles": []}, {"profiles": "citizen"}])
+def test_custom_batch_requires_a_profiles_list(client, body):
+    assert client.post("/api/recommendations/custom/batch", json=body).status_code == 400
+
+
+def test_custom_batch_rejects_oversized_batches(client):
+    profiles = [{"userType": "citizen"}] * (routes.MAX_BATCH_PROFILES + 1)
+    resp = client.post("/api/recommendations/custom/batch", json={"profiles": profiles})
+    assert resp.status_code == 400
+    assert client.fake_service.user_types == []
@@ -0,0 +1,292 @@
+import orjson
+import pytest
+from flask import Flask
+
+import travel_plan.routes as routes
+from travel_plan.routes import NS, _plan_from_binding
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, payload=None):
+        self.status_code = status_code
+        self.content = orjson.dumps(payload or {})
+        self.text = self.content.decode()
+
+
+class FakeSession:
+    """Stands in for the pooled Fuseki session: records queries/updates, answers SELECTs with .bindings"""
+
+    def __init__(self):
+        self.queries = []
+        self.updates = []
+        self.bindings = []
+        self.update_status = 204
+
+    def post(self, url, data=None, headers=None, timeout=None):
+        if url == routes.FUSEKI_UPDATE:
+            self.updates.append(data.decode("utf-8"))
+            return FakeResponse(self.update_status)
+        self.queries.append(data["query"])
+        return FakeResponse(payload={"results": {"bindings": self.bindings}})
+
+
+@pytest.fixture
+def session(monkeypatch):
+    session = FakeSession()
+    monkeypatch.setattr(routes, "_session", session)
+    routes._cache.clear()
+    return session
+
+
+@pytest.fixture
+def client(session):
+    app = Flask(__name__)
+    app.register_blueprint(routes.router, url_prefix="/api/travel-plans")
+    return app.test_client()
+
+
+def test_batch_create_writes_valid_plans_in_one_update(client, session):
+    resp = client.post("/api/travel-plans/", json=[
+        {"localname": "A", "class": NS + "DailyCommutePlan", "startTime": "08:00:00", "isActive": True},
+        {"class": NS + "TourPlan"},
+        "not a plan",
+        {"uri": "http://example.org/B", "class": NS + "TourPlan", "daysOfWeek": 'Mon "and" Tue'},
+    ])
+
+    assert resp.status_code == 207
+    assert resp.get_json()["results"] == [
+        {"index": 0, "ok": True, "uri": NS + "A"},
+        {"index": 1, "ok": False, "error": "uri or localname required"},
+        {"index": 2, "ok": False, "error": "plan must be an object"},
+        {"index": 3, "ok": True, "uri": "http://example.org/B"},
+    ]
+    assert len(session.updates) == 1
+    update = session.updates[0]
+    assert f"<{NS}A> a <{NS}DailyCommutePlan> ." in update
+    assert '"08:00:00"^^<http://www.w3.org/2001/XMLSchema#time>' in update
+    assert '"Mon \\"and\\" Tue"' in update
+
+
+def test_batch_create_marks_every_plan_failed_when_fuseki_fails(client, session):
+    session.update_status = 500
+
+    resp = client.post("/api/travel-plans/", json=[
+        {"localname": "A", "class": NS + "TourPlan"}, {"localname": "B", "class": NS + "TourPlan"},
+    ])
+
+    assert resp.status_code == 207
+    assert [r["ok"] for r in resp.get_json()["results"]] == [False, False]
+
+
+def test_batch_create_rejects_empty_and_oversized_lists(client, session):
+    assert client.post("/api/travel-plans/", json=[]).status_code == 400
+    too_many = [{"localname": f"P{i}", "class": NS + "TourPlan"} for i in range(routes.MAX_BATCH_PLANS + 1)]
+    assert client.post("/api/travel-plans/", json=too_many).status_code == 400
+    assert session.updates == []
+
+
+def plan_row(localname, **pairs):
+    row = {"plan": {"type": "uri", "value": NS + localname}, "type": {"type": "uri", "value": NS + "TourPlan"}}
+    row.update({var: {"type": "literal", "value": value} for var, value in pairs.items()})
+    return row
+
+
+def test_get_answers_repeat_requests_with_304(client, session):
+    session.bindings = [plan_row("A")]
+
+    first = client.get("/api/travel-plans/A")
+    assert first.status_code == 200
+    assert first.get_json()["uri"] == NS + "A"
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == f"max-age={routes.RESPONSE_CACHE_TTL}"
+
+    again = client.get("/api/travel-plans/A", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.data == b""
+    assert again.headers["ETag"] == etag
+    assert len(session.queries) == 1
+
+
+def test_list_is_cached_after_streaming_and_answers_304(client, session):
+    session.bindings = [plan_row("A"), plan_row("B")]
+
+    streamed = client.get("/api/travel-plans/")
+    assert [p["uri"] for p in streamed.get_json()["plans"]] == [NS + "A", NS + "B"]
+
+    cached = client.get("/api/travel-plans/")
+    assert cached.data == streamed.data
+    assert client.get("/api/travel-plans/", headers={"If-None-Match": cached.headers["ETag"]}).status_code == 304
+    assert len(session.queries) == 1
+
+
+def test_creating_a_plan_clears_cached_responses(client, session):
+    session.bindings = [plan_row("A")]
+    client.get("/api/travel-plans/A")
+
+    assert client.post("/api/travel-plans/", json={"localname": "B", "class": "TourPlan"}).status_code == 201
+    client.get("/api/travel-plans/A")
+    assert len(session.queries) == 2
+
+
+@pytest.mark.parametrize("plan_class, expected", [
+    ("DailyCommutePlan", NS + "DailyCommutePlan"),
+    (NS + "WeeklyPlan", NS + "WeeklyPlan"),
+])
+def test_create_accepts_plan_classes_by_uri_or_local_name(client, session, plan_class, expected):
+    resp = client.post("/api/travel-plans/", json={"localname": "A", "class": plan_class})
+
+    assert resp.status_code == 201
+    assert f"<{NS}A> a <{expected}> ." in session.updates[0]
+
+
+@pytest.mark.parametrize("plan_class", [
+    None, "http://example.org/Plan", NS + "Person", "> . <x> <y> <z", ["TourPlan"],
+])
+def test_create_rejects_unsupported_classes(client, session, plan_class):
+    resp = client.post("/api/travel-plans/", json={"localname": "A", "class": plan_class})
+
+    assert resp.status_code == 400
+    assert session.updates == []
+
+
+def test_batch_create_reports_unsupported_classes_per_plan(client, session):
+    resp = client.post("/api/travel-plans/", json=[
+        {"localname": "A", "class": "TourPlan"}, {"localname": "B", "class": "http://example.org/Plan"},
+    ])
+
+    first, second = resp.get_json()["results"]
+    assert first["ok"] and not second["ok"]
+    assert second["error"].startswith("unsupported class")
+    assert "example.org" not in session.updates[0]
+
+
+@pytest.mark.parametrize("q", ['a"b', "a\\b", "line\nbreak", "tab\there", "x" * 65])
+def test_list_rejects_invalid_q(client, session, q):
+    assert client.get("/api/travel-plans/", query_string={"q": q}).status_code == 400
+    assert session.queries == []
+
+
+def test_list_filters_on_a_valid_q_without_escaping(client, session):
+    client.get("/api/travel-plans/", query_string={"q": "St. Louis-Nord", "prefix": "1"})
+
+    assert 'FILTER(STRSTARTS(LCASE(str(?pName)), "st. louis-nord"))' in session.queries[0]
+
+
+@pytest.mark.parametrize("localname", ['a"b', "9plan", "a b", "x" * 130])
+def test_get_rejects_invalid_localnames(client, session, localname):
+    assert client.get(f"/api/travel-plans/{localname}").status_code == 400
+    assert session.queries == []
+
+
+@pytest.mark.parametrize("fields, error", [
+    ({"localname": "A> <x> <y"}, "invalid localname"),
+    ({"localname": "9plan"}, "invalid localname"),
+    ({"localname": ["A"]}, "invalid localname"),
+    ({"uri": "http://example.org/A> <x> <y"}, "invalid uri"),
+    ({"uri": "http://example.org/A B"}, "invalid uri"),
+    ({"localname": "A", "person": 'http://example.org/p"'}, "invalid person IRI"),
+    ({"localname": "A", "startStation": "http://example.org/s\n"}, "invalid startStation IRI"),
+    ({"localname": "A", "endStation": "http://example.org/{e}"}, "invalid endStation IRI"),
+    ({"localname": "A", "transportMode": 42}, "invalid transportMode IRI"),
+])
+def test_create_rejects_unsafe_iris(client, session, fields, error):
+    resp = client.post("/api/travel-plans/", json={"class": "TourPlan", **fields})
+
+    assert resp.status_code == 400
+    assert resp.get_json() == {"error": error}
+    assert session.updates == []
+
+
+def test_batch_create_reports_unsafe_iris_per_plan(client, session):
+    resp = client.post("/api/travel-plans/", json=[
+        {"localname": "A", "class": "TourPlan", "person": "http://example.org/p"},
+        {"localname": "B", "class": "TourPlan", "person": "http://example.org/p> <x> <y"},
+    ])
+
+    assert resp.status_code == 207
+    assert resp.get_json()["results"][1] == {"index": 1, "ok": False, "error": "invalid person IRI"}
+    [update] = session.updates
+    assert f"<http://example.org/p> <{NS}hasTravelPlan> <{NS}A> ." in update
+    assert f"<{NS}B>" not in update and "<x>" not in update
+
+
+def test_get_looks_up_the_ground_iri_only(client, session):
+    assert client.get("/api/travel-plans/Plan_1.v2").status_code == 404
+
+    [query] = session.queries
+    assert f"VALUES ?plan {{ <{NS}Plan_1.v2> }}" in query
+    assert "strafter" not in query
+
+
+def test_get_caches_misses_until_a_plan_is_created(client, session):
+    assert client.get("/api/travel-plans/A").status_code == 404
+    assert client.get("/api/travel-plans/A").status_code == 404
+    assert len(session.queries) == 1
+
+    client.post("/api/travel-plans/", json={"localname": "A", "class": "TourPlan"})
+    session.bindings = [plan_row("A")]
+    assert client.get("/api/travel-plans/A").status_code == 200
+    assert len(session.queries) == 2
+
+
+def test_fields_projection_narrows_the_query_and_the_items(client, session):
+    session.bindings = [plan_row("A", personPair="http://example.org/alice\tAlice")]
+
+    resp = client.get("/api/travel-plans/", query_string={"fields": "type,personName"})
+
+    assert resp.get_json() == {"plans": [{"uri": NS + "A", "type": NS + "TourPlan", "personName": "Alice"}]}
+    query = session.queries[0]
+    assert "?personPair" in query and "sc:hasTravelPlan" in query
+    assert "hasStartStation" not in query and "usesTransportMode" not in query
+
+
+@pytest.mark.parametrize("fields", ["uri", "uri,type"])
+def test_fields_projection_accepts_base_fields_without_joins(client, session, fields):
+    session.bindings = [plan_row("A")]
+
+    resp = client.get("/api/travel-plans/", query_string={"fields": fields})
+
+    assert resp.status_code == 200
+    assert set(resp.get_json()["plans"][0]) == set(fields.split(","))
+    assert "OPTIONAL" not in session.queries[0]
+
+
+def test_fields_projection_keeps_the_person_join_for_q(client, session):
+    session.bindings = [plan_row("A", personPair="http://example.org/alice\tAlice")]
+
+    resp = client.get("/api/travel-plans/", query_string={"fields": "type", "q": "ali"})
+
+    assert "sc:hasTravelPlan" in session.queries[0]
+    assert resp.get_json() == {"plans": [{"uri": NS + "A", "type": NS + "TourPlan"}]}
+
+
+def test_fields_projection_rejects_unknown_fields(client, session):
+    resp = client.get("/api/travel-plans/", query_string={"fields": "type,secret"})
+
+    assert resp.status_code == 400
+    assert resp.get_json()["error"] == "unknown fields: secret"
+    assert session.queries == []
+
+
+def test_plan_from_binding_splits_sampled_iri_name_pairs():
+    row = plan_row("A", personPair="http://example.org/alice\tAlice\tB.",
+                   startPair="http://example.org/s1", modePair="http://example.org/bus\t")
+
+    assert _plan_from_binding(row) == {
+        "uri": NS + "A",
+        "type": NS + "TourPlan",
+        "person": "http://example.org/alice",
+        "personName": "Alice\tB.",
+        "startStation": "http://example.org/s1",
+        "startStationName": None,
+        "endStation": None,
+        "endStationName": None,
+        "transportMode": "http://example.org/bus",
+        "transportModeName": "",
+    }
+
+
+def test_plan_queries_sample_each_iri_with_its_name():
+    for iri_var, name_var in (("p", "pName"), ("start", "startName"), ("end", "endName"), ("mode", "modeName")):
+        assert f'SAMPLE(CONCAT(STR(?{iri_var}), COALESCE(CONCAT("\\t", STR(?{name_var})), "")))' in routes._LIST_QUERY_PREFIX
+    assert "SAMPLE(?pName)" not in routes._LIST_QUERY_PREFIX
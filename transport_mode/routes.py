@@ -1,4 +1,7 @@
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from flask import Blueprint, jsonify, request
 try:
     from SPARQLWrapper import SPARQLWrapper, JSON
@@ -14,7 +17,7 @@ except ImportError:
             return MockResult()
     JSON = "json"
 
-from sparql_service import get_sparql_service
+from sparql_service import escape_sparql_literal, get_sparql_service
 
 # Robust import for requests (fallback to urllib shim if not installed)
 try:
@@ -53,12 +56,20 @@ router = Blueprint('transport_mode', __name__)
 FUSEKI_ENDPOINT = os.getenv('FUSEKI_QUERY', "http://localhost:3030/smartcity/query")
 FUSEKI_UPDATE = os.getenv('FUSEKI_UPDATE', "http://localhost:3030/smartcity/update")
 
+# Worker pool for independent per-class lookups (I/O bound, so threads are enough)
+CLASS_QUERY_WORKERS = 8
+CLASS_QUERY_POOL = ThreadPoolExecutor(max_workers=CLASS_QUERY_WORKERS)
+MAX_CLASS_LOOKUPS = 50
+
 # Get enhanced SPARQL service instance
 sparql_service = get_sparql_service(FUSEKI_ENDPOINT)
 
 def execute_sparql_query(query):
-    """Enhanced SPARQL query execution with validation and timeout"""
-    result = sparql_service.execute_query_with_validation(query)
+    """
+    SPARQL query execution for queries built in this module (trusted: no sanitize/validate pass).
+    Results are cached; the write endpoints below invalidate the cache.
+    """
+    result = sparql_service.execute_query_with_validation(query, validate=False, sanitize=False, cache=True)
     
     if result.success:
         return result.data
@@ -66,6 +77,73 @@ def execute_sparql_query(query):
         print(f"[transport_mode] Enhanced SPARQL error: {result.error} (endpoint={FUSEKI_ENDPOINT})")
         return None
 
+def _extract(b, keys=("mode", "name", "speed")):
+    """Flatten one JSON binding to {var: value}, with None for unbound variables"""
+    return {k: (b[k]["value"] if k in b else None) for k in keys}
+
+def execute_sparql_rows(query):
+    """Run a SELECT and return its rows as plain tuples in projection order (TSV results)"""
+    result = sparql_service.execute_query_with_validation(
+        query, validate=False, sanitize=False, return_format="tsv", cache=True
+    )
+
+    if result.success:
+        return result.data["rows"]
+    else:
+        print(f"[transport_mode] Enhanced SPARQL error: {result.error} (endpoint={FUSEKI_ENDPOINT})")
+        return []
+
+# RDF/RDFS/OWL schema namespaces: their classes are never transport modes
+_SYSTEM_PREFIXES = (
+    "http://www.w3.org/2000/01/rdf-schema",
+    "http://www.w3.org/1999/02/22-rdf-syntax-ns",
+    "http://www.w3.org/2002/07/owl#",
+)
+_SYSTEM_CLASS_FILTER = " && ".join(f'!STRSTARTS(str(?type), "{prefix}")' for prefix in _SYSTEM_PREFIXES)
+
+def is_system_class(u):
+    return u.startswith(_SYSTEM_PREFIXES)
+
+# Non-schema classes found in the dataset, with their hasName/hasSpeed property URIs.
+# The schema rarely changes, so detection runs at most once per TTL (or after a create).
+CLASS_CACHE_TTL = 300
+_class_cache = {"classes": None, "expires": 0}
+_class_cache_lock = threading.Lock()
+
+def get_user_classes():
+    """Return cached (class_uri, hasName_uri, hasSpeed_uri) tuples, refreshing them after the TTL"""
+    with _class_cache_lock:
+        if _class_cache["classes"] is not None and time.monotonic() < _class_cache["expires"]:
+            return _class_cache["classes"]
+
+        det = execute_sparql_query("""
+        SELECT DISTINCT ?class WHERE {
+          ?s a ?class .
+        } LIMIT 200
+        """)
+        classes = (det.get("results", {}).get("bindings", []) if det else [])
+        user_classes = []
+        for c in classes:
+            class_uri = c["class"]["value"]
+            if is_system_class(class_uri):
+                continue
+            if '#' in class_uri:
+                base = class_uri.rsplit('#', 1)[0] + '#'
+            else:
+                base = class_uri.rsplit('/', 1)[0] + '/'
+            user_classes.append((class_uri, base + "hasName", base + "hasSpeed"))
+
+        # Do not pin an empty result from a failed query for the whole TTL
+        if det is not None:
+            _class_cache["classes"] = user_classes
+            _class_cache["expires"] = time.monotonic() + CLASS_CACHE_TTL
+        return user_classes
+
+def invalidate_class_cache():
+    """Force the next get_user_classes() call to re-run class detection"""
+    with _class_cache_lock:
+        _class_cache["expires"] = 0
+
 @router.route('/', methods=['GET'])
 def list_transport_modes():
     """
@@ -75,141 +153,106 @@ def list_transport_modes():
       - q : filter by name substring
       - debug=1 : include diagnostic info
     """
-    q = request.args.get('q', '').replace('"', '\\"')
+    q = escape_sparql_literal(request.args.get('q', ''))
     debug = request.args.get('debug', '0') == '1'
 
     ns = "http://www.semanticweb.org/monpc/ontologies/2025/9/untitled-ontology-4#"
     filter_clause = f'FILTER regex(str(?name), "{q}", "i")' if q else ""
 
-    # Primary SPARQL: match explicit classes Bike, Bus, Metro (as in your Fuseki query)
-    primary_q = f"""
+    # record tried prefixes for debug
+    base_uri = ns.rstrip('#/')
+    candidate_prefixes = [base_uri + "#", base_uri + "/", base_uri]
+
+    # One round-trip for the primary Bike/Bus/Metro query and the older
+    # TransportMode-based variants (in case some datasets use a TransportMode class).
+    # ?source tells which branch a row came from.
+    prefix_rows = " ".join(
+        f'(<{prefix}TransportMode> <{prefix}hasName> <{prefix}hasSpeed> "{prefix}")'
+        for prefix in candidate_prefixes
+    )
+    merged_q = f"""
     PREFIX sc: <{ns}>
     PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
 
-    SELECT ?mode ?type ?name ?speed
+    SELECT ?mode ?type ?name ?speed ?source
     WHERE {{
-      ?mode a ?type .
-      FILTER(?type = sc:Bike || ?type = sc:Bus || ?type = sc:Metro)
-      OPTIONAL {{ ?mode sc:hasName ?name . }}
-      OPTIONAL {{ ?mode sc:hasSpeed ?speed . }}
+      {{
+        VALUES ?type {{ sc:Bike sc:Bus sc:Metro }}
+        ?mode a ?type .
+        OPTIONAL {{ ?mode sc:hasName ?name . }}
+        OPTIONAL {{ ?mode sc:hasSpeed ?speed . }}
+        BIND("primary" AS ?source)
+      }}
+      UNION
+      {{
+        VALUES (?type ?hasName ?hasSpeed ?source) {{ {prefix_rows} }}
+        ?mode rdf:type ?type .
+        OPTIONAL {{ ?mode ?hasName ?name . }}
+        OPTIONAL {{ ?mode ?hasSpeed ?speed . }}
+      }}
       {filter_clause}
     }}
     ORDER BY ?mode
     """
-    print("[transport_mode] Running primary Bike/Bus/Metro query")
-    print(primary_q)
-    results = execute_sparql_query(primary_q)
-    bindings = results.get("results", {}).get("bindings", []) if results else []
-
-    tried_prefixes = []
-    used_class_detection = None
-
-    if bindings:
-        modes = []
-        for b in bindings:
-            modes.append({
-                "uri": b["mode"]["value"],
-                "type": b.get("type", {}).get("value"),
-                "name": b.get("name", {}).get("value"),
-                "speed": b.get("speed", {}).get("value")
-            })
+    print("[transport_mode] Running merged Bike/Bus/Metro + TransportMode query")
+    print(merged_q)
+    rows = execute_sparql_rows(merged_q)
+
+    # rows are (mode, type, name, speed, source)
+    by_source = {}
+    for row in rows:
+        by_source.setdefault(row[4], []).append(row)
+
+    if by_source.get("primary"):
+        modes = [
+            {"uri": mode, "type": type_, "name": name, "speed": speed}
+            for mode, type_, name, speed, _ in by_source["primary"]
+        ]
         resp = {"modes": modes}
         return jsonify(resp)
 
-    # fallback: try previous candidate-prefix based queries and detection (preserve existing behavior)
-    # record tried prefixes for debug
-    base_uri = ns.rstrip('#/')
-    candidate_prefixes = [base_uri + "#", base_uri + "/", base_uri]
-    tried_prefixes.extend(candidate_prefixes)
-
-    # Try the older TransportMode-based attempts (in case some datasets use a TransportMode class)
-    sparql_template = """
-    PREFIX : <{prefix}>
-    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-
-    SELECT ?mode ?name ?speed
-    WHERE {{
-        ?mode rdf:type :TransportMode .
-        OPTIONAL {{ ?mode :hasName ?name . }}
-        OPTIONAL {{ ?mode :hasSpeed ?speed . }}
-        {filter}
-    }}
-    """
     for prefix in candidate_prefixes:
-        query = sparql_template.format(prefix=prefix, filter=filter_clause)
-        print(f"[transport_mode] Trying TransportMode prefix: {prefix}")
-        res = execute_sparql_query(query)
-        binds = res.get("results", {}).get("bindings", []) if res else []
-        if binds:
-            modes = []
-            for b in binds:
-                modes.append({
-                    "uri": b["mode"]["value"],
-                    "name": b.get("name", {}).get("value"),
-                    "speed": b.get("speed", {}).get("value")
-                })
+        prefix_rows = by_source.get(prefix)
+        if prefix_rows:
+            modes = [
+                {"uri": mode, "name": name, "speed": speed}
+                for mode, _, name, speed, _ in prefix_rows
+            ]
             resp = {"modes": modes, "_used_prefix": prefix}
             return jsonify(resp)
 
-    # Detect classes and try per-class instance queries (exclude RDF/OWL schema classes)
-    detect_q = """
-    SELECT DISTINCT ?class WHERE {
-      ?s a ?class .
-    } LIMIT 200
+    # Instances of any non-schema class (exclude RDF/OWL schema classes), in a single query;
+    # hasName/hasSpeed are matched by local name so each class's own namespace is used
+    any_class_q = f"""
+    SELECT ?mode ?type ?name ?speed WHERE {{
+      ?mode a ?type .
+      FILTER({_SYSTEM_CLASS_FILTER})
+      OPTIONAL {{ ?mode ?nameProp ?name . FILTER(STRENDS(str(?nameProp), "hasName")) }}
+      OPTIONAL {{ ?mode ?speedProp ?speed . FILTER(STRENDS(str(?speedProp), "hasSpeed")) }}
+      {filter_clause}
+    }} LIMIT 10000
     """
-    det = execute_sparql_query(detect_q)
-    classes = (det.get("results", {}).get("bindings", []) if det else [])
-    classes_list = [c["class"]["value"] for c in classes]
-
-    def is_system_class(u):
-        return u.startswith("http://www.w3.org/2000/01/rdf-schema") or u.startswith("http://www.w3.org/1999/02/22-rdf-syntax-ns") or u.startswith("http://www.w3.org/2002/07/owl#")
-
     collected = {}
-    used_classes = []
-    for class_uri in classes_list:
-        if is_system_class(class_uri):
-            continue
-        # try instances for this class
-        if '#' in class_uri:
-            base = class_uri.rsplit('#', 1)[0] + '#'
-        else:
-            base = class_uri.rsplit('/', 1)[0] + '/'
-        hasName_uri = base + "hasName"
-        hasSpeed_uri = base + "hasSpeed"
-        inst_q = f"""
-        SELECT ?mode ?name ?speed WHERE {{
-          ?mode a <{class_uri}> .
-          OPTIONAL {{ ?mode <{hasName_uri}> ?name . }}
-          OPTIONAL {{ ?mode <{hasSpeed_uri}> ?speed . }}
-          {filter_clause}
-        }} LIMIT 100
-        """
-        inst_res = execute_sparql_query(inst_q)
-        binds = inst_res.get("results", {}).get("bindings", []) if inst_res else []
-        if binds:
-            used_classes.append(class_uri)
-            for b in binds:
-                uri = b["mode"]["value"]
-                if uri not in collected:
-                    collected[uri] = {
-                        "uri": uri,
-                        "type": class_uri,
-                        "name": b.get("name", {}).get("value"),
-                        "speed": b.get("speed", {}).get("value")
-                    }
+    for mode, type_, name, speed in execute_sparql_rows(any_class_q):
+        if mode not in collected:
+            collected[mode] = {"uri": mode, "type": type_, "name": name, "speed": speed}
 
     if collected:
         modes = list(collected.values())
-        resp = {"modes": modes}
-        if used_classes:
-            resp["_detected_class"] = used_classes[0]
+        resp = {"modes": modes, "_detected_class": modes[0]["type"]}
         return jsonify(resp)
 
     # still nothing: return empty with debug info if requested
     resp = {"modes": []}
     if debug:
-        resp["_tried_prefixes"] = tried_prefixes
-        resp["_classes_sample"] = classes_list
+        det = execute_sparql_query("""
+        SELECT DISTINCT ?class WHERE {
+          ?s a ?class .
+        } LIMIT 200
+        """)
+        classes = (det.get("results", {}).get("bindings", []) if det else [])
+        resp["_tried_prefixes"] = candidate_prefixes
+        resp["_classes_sample"] = [c["class"]["value"] for c in classes]
     return jsonify(resp), 200
 
 @router.route('/<path:localname>', methods=['GET'])
@@ -218,7 +261,7 @@ def get_transport_mode(localname):
     Try to find an instance matching localname among Bike/Bus/Metro first,
     then fallback to other detection strategies.
     """
-    q_local = localname.replace('"', '\\"')
+    q_local = escape_sparql_literal(localname)
     ns = "http://www.semanticweb.org/monpc/ontologies/2025/9/untitled-ontology-4#"
 
     # try Bike/Bus/Metro specific lookup
@@ -232,35 +275,14 @@ def get_transport_mode(localname):
       FILTER(strafter(str(?mode), "{q_local}") = "{q_local}")
     }} LIMIT 1
     """
-    res = execute_sparql_query(single_q)
-    binds = res.get("results", {}).get("bindings", []) if res else []
-    if binds:
-        b = binds[0]
-        return jsonify({
-            "uri": b["mode"]["value"],
-            "type": b.get("type", {}).get("value"),
-            "name": b.get("name", {}).get("value"),
-            "speed": b.get("speed", {}).get("value")
-        })
+    rows = execute_sparql_rows(single_q)
+    if rows:
+        mode, type_, name, speed = rows[0]
+        return jsonify({"uri": mode, "type": type_, "name": name, "speed": speed})
 
     # fallback: try other classes (existing logic)
-    # reuse detection approach from list_transport_modes to search other classes
-    det = execute_sparql_query("""
-    SELECT DISTINCT ?class WHERE {
-      ?s a ?class .
-    } LIMIT 200
-    """)
-    classes = (det.get("results", {}).get("bindings", []) if det else [])
-    for c in classes:
-        class_uri = c["class"]["value"]
-        if class_uri.startswith("http://www.w3.org/2000/01/rdf-schema") or class_uri.startswith("http://www.w3.org/1999/02/22-rdf-syntax-ns") or class_uri.startswith("http://www.w3.org/2002/07/owl#"):
-            continue
-        if '#' in class_uri:
-            base = class_uri.rsplit('#', 1)[0] + '#'
-        else:
-            base = class_uri.rsplit('/', 1)[0] + '/'
-        hasName_uri = base + "hasName"
-        hasSpeed_uri = base + "hasSpeed"
+    def find_in_class(user_class):
+        class_uri, hasName_uri, hasSpeed_uri = user_class
         inst_q = f"""
         SELECT ?mode ?name ?speed WHERE {{
           ?mode a <{class_uri}> .
@@ -271,43 +293,44 @@ def get_transport_mode(localname):
         """
         res2 = execute_sparql_query(inst_q)
         binds2 = res2.get("results", {}).get("bindings", []) if res2 else []
-        if binds2:
-            b = binds2[0]
-            return jsonify({
-                "uri": b["mode"]["value"],
-                "type": class_uri,
-                "name": b.get("name", {}).get("value"),
-                "speed": b.get("speed", {}).get("value")
-            })
+        return binds2[0] if binds2 else None
+
+    candidate_classes = get_user_classes()[:MAX_CLASS_LOOKUPS]
+
+    # Query classes concurrently, one batch at a time so the first match still short-circuits;
+    # map() keeps class order, so the same class wins as with a sequential scan
+    for start in range(0, len(candidate_classes), CLASS_QUERY_WORKERS):
+        batch = candidate_classes[start:start + CLASS_QUERY_WORKERS]
+        for (class_uri, _, _), b in zip(batch, CLASS_QUERY_POOL.map(find_in_class, batch)):
+            if b:
+                mode = _extract(b)
+                return jsonify({"uri": mode["mode"], "type": class_uri, "name": mode["name"], "speed": mode["speed"]})
 
     return jsonify({"error": "Not found"}), 404
 
-@router.route('/', methods=['POST'])
-def create_transport_mode():
+TRANSPORT_MODE_NS = "http://www.semanticweb.org/monpc/ontologies/2025/9/untitled-ontology-4#"
+HAS_NAME_URI = TRANSPORT_MODE_NS + "hasName"
+HAS_SPEED_URI = TRANSPORT_MODE_NS + "hasSpeed"
+UPDATE_HEADERS = {"Content-Type": "application/sparql-update"}
+
+# Keep each bulk INSERT DATA request under this many bytes
+MAX_UPDATE_BYTES = 100_000
+
+def build_mode_triples(data):
     """
-    POST /api/transport-modes/
-    JSON body fields:
-      - uri (optional) : full URI for the new individual
-      - localname (optional) : local name to append to ontology base (used if uri not provided)
-      - class (optional) : class URI to use for rdf:type (if omitted defaults to NamedIndividual)
-      - name (optional) : value for hasName
-      - speed (optional) : value for hasSpeed
-    Example:
-      {"localname":"BikeX","class":"http://...#Bike","name":"Bike X","speed":"12"}
+    Build the INSERT DATA triples for one transport-mode dict.
+    Returns (uri, triples_text) or (None, error message).
     """
-    data = request.get_json() or {}
     uri = data.get("uri")
     localname = data.get("localname")
     class_uri = data.get("class")
     name = data.get("name")
     speed = data.get("speed")
 
-    base_uri = "http://www.semanticweb.org/monpc/ontologies/2025/9/untitled-ontology-4#"
-
     if not uri:
         if not localname:
-            return jsonify({"error": "uri or localname required"}), 400
-        uri = base_uri + localname
+            return None, "uri or localname required"
+        uri = TRANSPORT_MODE_NS + localname
 
     triples = []
     if class_uri:
@@ -315,26 +338,100 @@ def create_transport_mode():
     else:
         triples.append(f"<{uri}> a <http://www.w3.org/2002/07/owl#NamedIndividual> .")
 
-    prop_base = base_uri
-    hasName_uri = prop_base + "hasName"
-    hasSpeed_uri = prop_base + "hasSpeed"
-
     if name is not None:
-        safe_name = name.replace('"', '\\"')
-        triples.append(f'<{uri}> <{hasName_uri}> "{safe_name}" .')
+        triples.append(f'<{uri}> <{HAS_NAME_URI}> "{escape_sparql_literal(name)}" .')
 
     if speed is not None:
-        safe_speed = str(speed).replace('"', '\\"')
-        triples.append(f'<{uri}> <{hasSpeed_uri}> "{safe_speed}" .')
+        triples.append(f'<{uri}> <{HAS_SPEED_URI}> "{escape_sparql_literal(speed)}" .')
+
+    return uri, "\n".join(triples)
 
-    update_query = "INSERT DATA { \n" + "\n".join(triples) + "\n }"
+def post_update(update_query):
+    """Send a SPARQL update to Fuseki; returns the response"""
+    return requests.post(FUSEKI_UPDATE, data=update_query.encode('utf-8'), headers=UPDATE_HEADERS, timeout=10)
+
+@router.route('/', methods=['POST'])
+def create_transport_mode():
+    """
+    POST /api/transport-modes/
+    JSON body fields:
+      - uri (optional) : full URI for the new individual
+      - localname (optional) : local name to append to ontology base (used if uri not provided)
+      - class (optional) : class URI to use for rdf:type (if omitted defaults to NamedIndividual)
+      - name (optional) : value for hasName
+      - speed (optional) : value for hasSpeed
+    Example:
+      {"localname":"BikeX","class":"http://...#Bike","name":"Bike X","speed":"12"}
+    """
+    data = request.get_json() or {}
+    uri, triples = build_mode_triples(data)
+    if uri is None:
+        return jsonify({"error": triples}), 400
+
+    update_query = "INSERT DATA { \n" + triples + "\n }"
 
     try:
-        headers = {"Content-Type": "application/sparql-update"}
-        resp = requests.post(FUSEKI_UPDATE, data=update_query.encode('utf-8'), headers=headers, timeout=10)
+        resp = post_update(update_query)
         if resp.status_code in (200, 201, 204):
+            sparql_service.invalidate_cache()
+            invalidate_class_cache()
             return jsonify({"ok": True, "uri": uri}), 201
         else:
             return jsonify({"error": "Fuseki update failed", "status": resp.status_code, "body": resp.text}), 500
     except Exception as e:
         return jsonify({"error": f"Update error: {str(e)}"}), 500
+
+@router.route('/bulk', methods=['POST'])
+def create_transport_modes_bulk():
+    """
+    POST /api/transport-modes/bulk
+    JSON body: {"items": [<same fields as POST /api/transport-modes/>, ...]}
+    All valid items are written with as few INSERT DATA requests as possible
+    (split only to keep each request under MAX_UPDATE_BYTES).
+    Returns 207 with one {"index", "ok", "uri"|"error"} entry per item.
+    """
+    data = request.get_json() or {}
+    items = data.get("items")
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "items must be a non-empty list"}), 400
+
+    results = [None] * len(items)
+    chunks = []  # (item indexes, their triples blocks) per INSERT DATA request
+    indexes, blocks, size = [], [], 0
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results[index] = {"index": index, "ok": False, "error": "item must be an object"}
+            continue
+        uri, triples = build_mode_triples(item)
+        if uri is None:
+            results[index] = {"index": index, "ok": False, "error": triples}
+            continue
+        results[index] = {"index": index, "ok": True, "uri": uri}
+        block_size = len(triples.encode('utf-8')) + 1
+        if blocks and size + block_size > MAX_UPDATE_BYTES:
+            chunks.append((indexes, blocks))
+            indexes, blocks, size = [], [], 0
+        indexes.append(index)
+        blocks.append(triples)
+        size += block_size
+    if blocks:
+        chunks.append((indexes, blocks))
+
+    written = False
+    for indexes, blocks in chunks:
+        update_query = "INSERT DATA { \n" + "\n".join(blocks) + "\n }"
+        try:
+            resp = post_update(update_query)
+            if resp.status_code in (200, 201, 204):
+                written = True
+                continue
+            error = f"Fuseki update failed (status {resp.status_code})"
+        except Exception as e:
+            error = f"Update error: {str(e)}"
+        for index in indexes:
+            results[index] = {"index": index, "ok": False, "error": error}
+
+    if written:
+        sparql_service.invalidate_cache()
+        invalidate_class_cache()
+    return jsonify({"results": results}), 207
@@ -3,9 +3,11 @@ Transport Recommendation API Routes
 Provides REST endpoints for transport recommendations based on user types and custom criteria.
 """
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, request, stream_with_context
+import orjson
 from transport_recommendation_service import TransportRecommendationService
 import logging
+import time
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -19,6 +21,47 @@ FUSEKI_ENDPOINT = "http://localhost:3030/smartcity/query"
 # Initialize transport recommendation service
 recommendation_service = TransportRecommendationService(fuseki_endpoint=FUSEKI_ENDPOINT)
 
+# Last successful health check, reused for HEALTH_CACHE_TTL seconds
+HEALTH_CACHE_TTL = 10
+_LAST_HEALTH = {'ts': 0.0, 'data': None}
+
+def _json(obj, status=200):
+    """Serialize obj with orjson into a JSON response"""
+    return Response(orjson.dumps(obj), status=status, mimetype='application/json')
+
+# Transport modes matching each (preference, value) pair of a custom request
+_PREF_TABLE = {
+    ('speed', 'high'): frozenset({'Metro'}),
+    ('speed', 'medium'): frozenset({'Bus'}),
+    ('speed', 'low'): frozenset({'Bike'}),
+    ('environmental', 'high'): frozenset({'Bike'}),
+    ('environmental', 'medium'): frozenset({'Metro'}),
+    ('environmental', 'low'): frozenset({'Bus'}),
+    ('cost', 'low'): frozenset({'Bike'}),
+    ('cost', 'medium'): frozenset({'Bus', 'Metro'}),
+    ('cost', 'high'): frozenset(),
+}
+_EMPTY = frozenset()
+
+# Upper bound on profiles per /recommendations/custom/batch request
+MAX_BATCH_PROFILES = 100
+
+# Custom-score bonus per (preference, value, transport mode)
+_SCORE_DELTAS = {
+    ('speed', 'high', 'Metro'): 0.2,
+    ('speed', 'low', 'Bike'): 0.1,
+    ('environmental', 'high', 'Bike'): 0.3,
+    ('environmental', 'medium', 'Metro'): 0.1,
+    ('cost', 'low', 'Bike'): 0.2,
+}
+# Modes getting the accessibility constraint bonus
+_ACCESSIBILITY_MODES = frozenset({'Bus', 'Metro'})
+
+# _SCORE_DELTAS regrouped by (preference, value): ((mode, delta), ...)
+_DELTAS_BY_PREFERENCE = {}
+for (_pref, _value, _mode), _delta in _SCORE_DELTAS.items():
+    _DELTAS_BY_PREFERENCE.setdefault((_pref, _value), []).append((_mode, _delta))
+
 @router.route('/recommendations/<user_type>', methods=['GET'])
 def get_recommendations_for_user_type(user_type):
     """
@@ -35,10 +78,10 @@ def get_recommendations_for_user_type(user_type):
         # Validate user type
         valid_user_types = ['citizen', 'tourist', 'staff']
         if user_type.lower() not in valid_user_types:
-            return jsonify({
+            return _json({
                 "error": f"Invalid user type: {user_type}",
                 "valid_types": valid_user_types
-            }), 400
+            }, 400)
         
         logger.info(f"Getting recommendations for user type: {user_type}")
         
@@ -46,20 +89,7 @@ def get_recommendations_for_user_type(user_type):
         recommendations = recommendation_service.get_recommendations_for_user_type(user_type)
         
         # Format response
-        recommendation_list = []
-        for rec in recommendations:
-            recommendation_data = {
-                "transportMode": rec.transport_mode,
-                "stations": rec.stations,
-                "relevanceScore": rec.relevance_score,
-                "reasoning": rec.reasoning
-            }
-            
-            # Add properties if available
-            if rec.properties:
-                recommendation_data["properties"] = rec.properties
-                
-            recommendation_list.append(recommendation_data)
+        recommendation_list = [rec.to_dict() for rec in recommendations]
         
         response = {
             "userType": user_type,
@@ -68,14 +98,25 @@ def get_recommendations_for_user_type(user_type):
         }
         
         logger.info(f"Generated {len(recommendation_list)} recommendations for {user_type}")
-        return jsonify(response)
+        return _json(response)
         
     except Exception as e:
         logger.error(f"Error getting recommendations for {user_type}: {str(e)}")
-        return jsonify({
+        return _json({
             "error": f"Failed to get recommendations for user type {user_type}",
             "message": str(e)
-        }), 500
+        }, 500)
+
+def _stream_stations(transport_type, stations, ns):
+    """Stream {"transportType", "stations": [...], "total"} with each station serialized on the fly"""
+    def generate():
+        yield b'{"transportType":' + orjson.dumps(transport_type) + b',"stations":['
+        for index, station_name in enumerate(stations):
+            if index:
+                yield b','
+            yield orjson.dumps({"name": station_name, "transportType": transport_type, "uri": ns + station_name})
+        yield b'],"total":' + str(len(stations)).encode() + b'}'
+    return Response(stream_with_context(generate()), mimetype='application/json')
 
 @router.route('/transport/<transport_type>/stations', methods=['GET'])
 def get_transport_stations(transport_type):
@@ -96,44 +137,33 @@ def get_transport_stations(transport_type):
         # Validate transport type
         valid_transport_types = ['Bike', 'Bus', 'Metro']
         if transport_type_normalized not in valid_transport_types:
-            return jsonify({
+            return _json({
                 "error": f"Invalid transport type: {transport_type}",
                 "valid_types": [t.lower() for t in valid_transport_types]
-            }), 400
+            }, 400)
         
         logger.info(f"Getting stations for transport type: {transport_type_normalized}")
         
         # Get transport-station mappings
         transport_stations = recommendation_service.get_transport_stations_mapping()
         
+        # Cached mapping: send the payload serialized alongside it
+        payload = recommendation_service.get_station_payload(transport_type_normalized)
+        if payload is not None:
+            return Response(payload, mimetype='application/json')
+        
         # Get stations for the specified transport type
         stations = transport_stations.get(transport_type_normalized, [])
         
-        # Format station data with additional details
-        station_list = []
-        for station_name in stations:
-            station_data = {
-                "name": station_name,
-                "transportType": transport_type_normalized,
-                "uri": f"{recommendation_service.ontology_namespace}{station_name}"
-            }
-            station_list.append(station_data)
-        
-        response = {
-            "transportType": transport_type_normalized,
-            "stations": station_list,
-            "total": len(station_list)
-        }
-        
-        logger.info(f"Found {len(station_list)} stations for {transport_type_normalized}")
-        return jsonify(response)
+        logger.info(f"Found {len(stations)} stations for {transport_type_normalized}")
+        return _stream_stations(transport_type_normalized, stations, recommendation_service.ontology_namespace)
         
     except Exception as e:
         logger.error(f"Error getting stations for {transport_type}: {str(e)}")
-        return jsonify({
+        return _json({
             "error": f"Failed to get stations for transport type {transport_type}",
             "message": str(e)
-        }), 500
+        }, 500)
 
 @router.route('/recommendations/custom', methods=['POST'])
 def get_custom_recommendations():
@@ -164,14 +194,14 @@ def get_custom_recommendations():
         data = request.get_json()
         
         if not data:
-            return jsonify({
+            return _json({
                 "error": "Request body is required",
                 "expected_format": {
                     "userType": "citizen|tourist|staff",
                     "preferences": {"speed": "high|medium|low", "cost": "high|medium|low"},
                     "constraints": {"maxDistance": "number", "availableTime": "number"}
                 }
-            }), 400
+            }, 400)
         
         user_type = data.get('userType', 'citizen')
         preferences = data.get('preferences', {})
@@ -183,54 +213,7 @@ def get_custom_recommendations():
         base_recommendations = recommendation_service.get_recommendations_for_user_type(user_type)
         
         # Apply custom scoring based on preferences and constraints
-        custom_recommendations = []
-        for rec in base_recommendations:
-            # Calculate custom relevance score
-            custom_score = rec.relevance_score
-            
-            # Apply preference modifiers
-            if preferences.get('speed') == 'high' and rec.transport_mode == 'Metro':
-                custom_score += 0.2
-            elif preferences.get('speed') == 'low' and rec.transport_mode == 'Bike':
-                custom_score += 0.1
-            
-            if preferences.get('environmental') == 'high' and rec.transport_mode == 'Bike':
-                custom_score += 0.3
-            elif preferences.get('environmental') == 'medium' and rec.transport_mode == 'Metro':
-                custom_score += 0.1
-            
-            if preferences.get('cost') == 'low' and rec.transport_mode == 'Bike':
-                custom_score += 0.2
-            
-            # Apply constraint modifiers
-            if constraints.get('accessibility') and rec.transport_mode in ['Bus', 'Metro']:
-                custom_score += 0.1
-            
-            # Cap score at 1.0
-            custom_score = min(1.0, custom_score)
-            
-            # Generate custom reasoning
-            custom_reasoning = rec.reasoning
-            if custom_score > rec.relevance_score:
-                custom_reasoning += f" (Enhanced match for your preferences: {', '.join(preferences.keys())})"
-            
-            custom_rec = {
-                "transportMode": rec.transport_mode,
-                "stations": rec.stations,
-                "relevanceScore": custom_score,
-                "originalScore": rec.relevance_score,
-                "reasoning": custom_reasoning,
-                "matchedPreferences": [pref for pref in preferences.keys() 
-                                     if _preference_matches_transport(pref, preferences[pref], rec.transport_mode)]
-            }
-            
-            if rec.properties:
-                custom_rec["properties"] = rec.properties
-                
-            custom_recommendations.append(custom_rec)
-        
-        # Sort by custom relevance score
-        custom_recommendations.sort(key=lambda x: x['relevanceScore'], reverse=True)
+        custom_recommendations = _apply_custom_scoring(base_recommendations, preferences, constraints)
         
         response = {
             "userType": user_type,
@@ -241,36 +224,129 @@ def get_custom_recommendations():
         }
         
         logger.info(f"Generated {len(custom_recommendations)} custom recommendations")
-        return jsonify(response)
+        return _json(response)
         
     except Exception as e:
         logger.error(f"Error generating custom recommendations: {str(e)}")
-        return jsonify({
+        return _json({
             "error": "Failed to generate custom recommendations",
             "message": str(e)
-        }), 500
+        }, 500)
 
-def _preference_matches_transport(preference: str, preference_value: str, transport_mode: str) -> bool:
-    """Helper function to check if a preference matches a transport mode"""
-    matches = {
-        'speed': {
-            'high': ['Metro'],
-            'medium': ['Bus'],
-            'low': ['Bike']
-        },
-        'environmental': {
-            'high': ['Bike'],
-            'medium': ['Metro'],
-            'low': ['Bus']
-        },
-        'cost': {
-            'low': ['Bike'],
-            'medium': ['Bus', 'Metro'],
-            'high': []
+def _custom_bonus_by_mode(preferences, constraints):
+    """Total custom-score bonus per transport mode for one request's preferences/constraints"""
+    bonus = {}
+    for pref, value in preferences.items():
+        for mode, delta in _DELTAS_BY_PREFERENCE.get((pref, value), ()):
+            bonus[mode] = bonus.get(mode, 0.0) + delta
+    if constraints.get('accessibility'):
+        for mode in _ACCESSIBILITY_MODES:
+            bonus[mode] = bonus.get(mode, 0.0) + 0.1
+    return bonus
+
+def _apply_custom_scoring(base_recommendations, preferences, constraints):
+    """Rescore base recommendations with the custom preferences/constraints, sorted by custom score"""
+    # Preferences/constraints are fixed for the request: resolve them once, not per recommendation
+    bonus_by_mode = _custom_bonus_by_mode(preferences, constraints)
+    enhanced_suffix = f" (Enhanced match for your preferences: {', '.join(preferences.keys())})"
+    
+    custom_recommendations = []
+    for rec in base_recommendations:
+        # Calculate custom relevance score: preference modifiers + constraint modifiers, capped at 1.0
+        custom_score = min(1.0, rec.relevance_score + bonus_by_mode.get(rec.transport_mode, 0.0))
+        
+        # Generate custom reasoning
+        custom_reasoning = rec.reasoning
+        if custom_score > rec.relevance_score:
+            custom_reasoning += enhanced_suffix
+        
+        custom_rec = {
+            "transportMode": rec.transport_mode,
+            "stations": rec.stations,
+            "relevanceScore": custom_score,
+            "originalScore": rec.relevance_score,
+            "reasoning": custom_reasoning,
+            "matchedPreferences": [pref for pref in preferences.keys() 
+                                 if _preference_matches_transport(pref, preferences[pref], rec.transport_mode)]
         }
-    }
+        
+        if rec.properties:
+            custom_rec["properties"] = rec.properties
+        
+        custom_recommendations.append(custom_rec)
     
-    return transport_mode in matches.get(preference, {}).get(preference_value, [])
+    # Sort by custom relevance score
+    custom_recommendations.sort(key=lambda x: x['relevanceScore'], reverse=True)
+    return custom_recommendations
+
+@router.route('/recommendations/custom/batch', methods=['POST'])
+def get_custom_recommendations_batch():
+    """
+    POST /api/recommendations/custom/batch
+    Score several custom profiles in one request.
+    
+    Request Body:
+        {"profiles": [{"userType": ..., "preferences": {...}, "constraints": {...}}, ...]}
+        (at most MAX_BATCH_PROFILES profiles, same fields as /recommendations/custom)
+        
+    Returns:
+        JSON response with one {"index", "userType", "recommendations", "total"} or
+        {"index", "error"} entry per profile
+    """
+    data = request.get_json(silent=True)
+    profiles = data.get('profiles') if isinstance(data, dict) else None
+    if not isinstance(profiles, list) or not profiles:
+        return _json({
+            "error": "Request body must contain a non-empty 'profiles' list",
+            "expected_format": {"profiles": [{"userType": "citizen|tourist|staff",
+                                              "preferences": {}, "constraints": {}}]}
+        }, 400)
+    if len(profiles) > MAX_BATCH_PROFILES:
+        return _json({"error": f"At most {MAX_BATCH_PROFILES} profiles per batch"}, 400)
+    
+    logger.info(f"Getting custom recommendations for {len(profiles)} profiles")
+    
+    # Base recommendations only depend on the user type: fetch each one once per batch
+    base_by_type = {}
+    results = []
+    for index, profile in enumerate(profiles):
+        if not isinstance(profile, dict):
+            results.append({"index": index, "error": "Profile must be a JSON object"})
+            continue
+        try:
+            user_type = profile.get('userType', 'citizen')
+            preferences = profile.get('preferences', {})
+            constraints = profile.get('constraints', {})
+            
+            key = user_type.lower()
+            if key not in base_by_type:
+                base_by_type[key] = recommendation_service.get_recommendations_for_user_type(user_type)
+            
+            custom_recommendations = _apply_custom_scoring(base_by_type[key], preferences, constraints)
+            results.append({
+                "index": index,
+                "userType": user_type,
+                "recommendations": custom_recommendations,
+                "total": len(custom_recommendations)
+            })
+        except Exception as e:
+            logger.error(f"Error scoring batch profile {index}: {str(e)}")
+            results.append({"index": index, "error": str(e)})
+    
+    return _json({"results": results, "total": len(results)})
+
+def _preference_matches_transport(preference: str, preference_value: str, transport_mode: str) -> bool:
+    """Helper function to check if a preference matches a transport mode"""
+    return transport_mode in _PREF_TABLE.get((preference, preference_value), _EMPTY)
+
+@router.route('/recommendations/cache/reload', methods=['POST'])
+def reload_recommendation_cache():
+    """
+    POST /api/recommendations/cache/reload
+    Clear cached station mappings and transport properties (e.g. after ontology updates).
+    """
+    recommendation_service.reload_cache()
+    return _json({"ok": True, "message": "Recommendation cache cleared"})
 
 # Health check endpoint for transport recommendation module
 @router.route('/recommendations/health', methods=['GET'])
@@ -279,31 +355,35 @@ def transport_recommendation_health():
     GET /api/recommendations/health
     Health check for transport recommendation functionality.
     
+    A successful check is reused for HEALTH_CACHE_TTL seconds so frequent probes
+    don't hit Fuseki; the check itself is a single ASK query.
+    
     Returns:
-        JSON response with service status and basic functionality test
+        JSON response with service status and Fuseki reachability
     """
+    now = time.monotonic()
+    if _LAST_HEALTH['data'] is not None and now - _LAST_HEALTH['ts'] < HEALTH_CACHE_TTL:
+        return _json(_LAST_HEALTH['data'])
+    
     try:
-        # Test basic functionality by getting recommendations for citizen
-        test_recommendations = recommendation_service.get_recommendations_for_user_type('citizen')
-        
-        # Test transport-station mapping
-        transport_stations = recommendation_service.get_transport_stations_mapping()
+        has_data = recommendation_service.ping()
         
         response = {
             "status": "healthy",
             "service": "transport_recommendation",
             "endpoint": FUSEKI_ENDPOINT,
-            "test_recommendations_count": len(test_recommendations),
-            "transport_modes_available": len(transport_stations)
+            "dataset_has_triples": has_data
         }
+        _LAST_HEALTH['ts'] = now
+        _LAST_HEALTH['data'] = response
         
-        return jsonify(response)
+        return _json(response)
         
     except Exception as e:
         logger.error(f"Health check failed: {str(e)}")
-        return jsonify({
+        return _json({
             "status": "unhealthy",
             "service": "transport_recommendation",
             "endpoint": FUSEKI_ENDPOINT,
             "error": str(e)
-        }), 503
\ No newline at end of file
+        }, 503)
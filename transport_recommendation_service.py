@@ -4,34 +4,79 @@ Utilizes semantic relationships in the WebSemEsprit ontology to suggest relevant
 """
 
 import logging
-from typing import Dict, Any, Optional, List
-from dataclasses import dataclass
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, NamedTuple, Optional, List
+import requests
+from requests.adapters import HTTPAdapter
+from cachetools import TTLCache
 from sparql_service import get_sparql_service
+
 try:
-    from SPARQLWrapper import SPARQLWrapper, JSON
+    from orjson import dumps as json_dumps, loads as json_loads
 except ImportError:
-    # Fallback for testing without SPARQLWrapper
-    class SPARQLWrapper:
-        def __init__(self, endpoint): pass
-        def setQuery(self, query): pass
-        def setReturnFormat(self, format): pass
-        def query(self): 
-            class MockResult:
-                def convert(self): return {"results": {"bindings": []}}
-            return MockResult()
-    JSON = "json"
+    import json
+    from json import loads as json_loads
+
+    def json_dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode()
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-@dataclass
-class Recommendation:
+QUERY_HEADERS = {"Accept": "application/sparql-results+json", "Accept-Encoding": "gzip"}
+QUERY_TIMEOUT = 10
+QUERY_WORKERS = 8
+
+# Ontology data behind the mapping/properties queries is essentially static
+QUERY_CACHE_TTL = 300
+
+# Base reasoning per user type and transport mode
+REASONING_TEMPLATES = {
+    "citizen": {
+        "Bus": "Buses provide reliable public transport for daily commuting with good coverage.",
+        "Metro": "Metro offers fast and efficient transport for urban travel with high frequency.",
+        "Bike": "Bikes provide eco-friendly transport for short to medium distances with health benefits."
+    },
+    "tourist": {
+        "Metro": "Metro provides quick access to major tourist attractions with comprehensive network coverage.",
+        "Bus": "Buses offer scenic routes and access to various tourist destinations throughout the city.",
+        "Bike": "Bikes allow flexible exploration of tourist areas at your own pace."
+    },
+    "staff": {
+        "Bike": "Bikes offer flexible and cost-effective transport for staff with parking convenience.",
+        "Bus": "Buses provide reliable transport for staff commuting with predictable schedules.",
+        "Metro": "Metro offers fast transport for staff working in central business districts."
+    }
+}
+
+def _bindings(results: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Bindings list of a SPARQL JSON result (empty if absent)"""
+    try:
+        return results["results"]["bindings"]
+    except KeyError:
+        return []
+
+def _val(binding: Dict[str, Any], key: str, default: Optional[str] = None) -> Optional[str]:
+    """Value of one variable in a binding, or default when unbound"""
+    term = binding.get(key)
+    return term["value"] if term else default
+
+class Recommendation(NamedTuple):
     """Represents a transport recommendation with relevance scoring"""
     transport_mode: str
     stations: List[str]
     relevance_score: float
     reasoning: str
     properties: Optional[Dict[str, Any]] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """API representation (properties only when available)"""
+        d = {"transportMode": self.transport_mode, "stations": self.stations,
+             "relevanceScore": self.relevance_score, "reasoning": self.reasoning}
+        if self.properties:
+            d["properties"] = self.properties
+        return d
 
 class TransportRecommendationService:
     """
@@ -66,8 +111,101 @@ class TransportRecommendationService:
             }
         }
         
+        # Per user type: (mode, base weight, base reasoning) in preference order, built once
+        self._precomputed = {
+            user: tuple(
+                (mode, prefs["weights"].get(mode, 0.5),
+                 REASONING_TEMPLATES.get(user, {}).get(mode, f"{mode} is suitable for {user} users."))
+                for mode in prefs["preferred_modes"]
+            )
+            for user, prefs in self.user_type_preferences.items()
+        }
+        
+        # The stations and per-user-type facts queries are the only ones on the request path:
+        # build them once so every call sends byte-identical text (also lets Fuseki reuse its parsed query)
+        self._query_cache: Dict[tuple, str] = {("stations",): self._stations_query()}
+        for user, prefs in self.user_type_preferences.items():
+            preferred = tuple(prefs["preferred_modes"])
+            self._query_cache[("facts", user, preferred)] = self._mode_facts_query(user, list(preferred))
+        
+        # Keep-alive session shared by every query of this service
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        
+        # Single-flight: identical queries running concurrently share one Fuseki request
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+        
+        # Shared pool for the independent queries of one recommendation request
+        self._executor = ThreadPoolExecutor(max_workers=QUERY_WORKERS)
+        
+        # TTL caches for the station mapping (plus its serialized per-mode station payloads)
+        # and the per-(user type, modes) scoring facts (only successful results)
+        self._mapping_cache = TTLCache(maxsize=2, ttl=QUERY_CACHE_TTL)
+        self._facts_cache = TTLCache(maxsize=16, ttl=QUERY_CACHE_TTL)
+        self._cache_lock = threading.Lock()
+        
         logger.info(f"TransportRecommendationService initialized with endpoint: {fuseki_endpoint}")
     
+    def _stations_query(self) -> str:
+        """Query mapping transport modes to compatible stations"""
+        return f"""PREFIX : <{self.ontology_namespace}>
+PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+
+SELECT DISTINCT ?transportMode ?station ?stationName
+WHERE {{
+    # Compatible (transport mode, station type) pairs
+    VALUES (?transportMode ?stationType) {{
+        (:Bike :BikeStation) (:Bus :BusStation) (:Metro :MetroStation)
+    }}
+    ?station rdf:type ?stationType .
+    OPTIONAL {{ ?station :hasName ?stationName . }}
+    
+    # Only modes that have at least one transport instance
+    FILTER EXISTS {{ ?transport rdf:type ?transportMode . }}
+}}"""
+    
+    def _mode_facts_query(self, user_type: str, transport_modes: List[str]) -> str:
+        """Combined relationship count / speed-capacity / properties query (see _get_mode_facts)"""
+        mode_values = " ".join(f":{mode}" for mode in transport_modes)
+        return f"""PREFIX : <{self.ontology_namespace}>
+PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+
+SELECT ?mode ?relationshipCount ?speed ?capacity ?property ?value
+WHERE {{
+    {{
+        SELECT ?mode (COUNT(*) AS ?relationshipCount)
+        WHERE {{
+            VALUES ?mode {{ {mode_values} }}
+            ?person rdf:type :{user_type.capitalize()} .
+            ?transport rdf:type ?mode .
+            OPTIONAL {{ ?person :usesTransport ?transport . }}
+        }}
+        GROUP BY ?mode
+    }}
+    UNION
+    {{
+        SELECT ?mode (SAMPLE(?s) AS ?speed) (SAMPLE(?c) AS ?capacity)
+        WHERE {{
+            VALUES ?mode {{ {mode_values} }}
+            ?transport rdf:type ?mode .
+            OPTIONAL {{ ?transport :hasSpeed ?s . }}
+            OPTIONAL {{ ?transport :hasCapacity ?c . }}
+        }}
+        GROUP BY ?mode
+    }}
+    UNION
+    {{
+        VALUES ?mode {{ {mode_values} }}
+        ?transport rdf:type ?mode .
+        ?transport ?property ?value .
+        FILTER(?property != rdf:type)
+    }}
+}}"""
+    
     def get_recommendations_for_user_type(self, user_type: str) -> List[Recommendation]:
         """
         Get transport recommendations for a specific user type with contextual suggestions.
@@ -86,34 +224,30 @@ class TransportRecommendationService:
         
         logger.info(f"Generating recommendations for user type: {user_type}")
         
-        # Get transport-station mappings
-        transport_stations = self.get_transport_stations_mapping()
-        
         recommendations = []
-        preferences = self.user_type_preferences[user_type]
+        precomputed = self._precomputed[user_type]
         
-        for transport_mode in preferences["preferred_modes"]:
-            # Calculate relevance score
-            relevance_score = self.calculate_relevance_score(user_type, transport_mode)
-            
-            # Get stations for this transport mode
-            stations = transport_stations.get(transport_mode, [])
-            
-            # Generate reasoning
-            reasoning = self._generate_reasoning(user_type, transport_mode, relevance_score)
+        # Transport-station mappings and the per-mode facts (relationship counts,
+        # speed/capacity and properties in one query) are independent: fetch them concurrently
+        stations_future = self._executor.submit(self.get_transport_stations_mapping)
+        mode_facts = self._get_mode_facts(user_type, [mode for mode, _, _ in precomputed])
+        transport_stations = stations_future.result()
+        
+        for transport_mode, base_score, base_reasoning in precomputed:
+            facts = mode_facts.get(transport_mode, {})
             
-            # Get additional properties
-            properties = self._get_transport_properties(transport_mode)
+            # Calculate relevance score (capped at 1.0)
+            relevance_score = min(1.0, base_score
+                                  + self._relationship_bonus_from_count(facts.get("relationship_count", 0))
+                                  + self._property_bonus_from_values(facts.get("speed"), facts.get("capacity")))
             
-            recommendation = Recommendation(
+            recommendations.append(Recommendation(
                 transport_mode=transport_mode,
-                stations=stations,
+                stations=transport_stations.get(transport_mode, []),
                 relevance_score=relevance_score,
-                reasoning=reasoning,
-                properties=properties
-            )
-            
-            recommendations.append(recommendation)
+                reasoning=self._score_qualifier(relevance_score) + base_reasoning,
+                properties=facts.get("properties", {})
+            ))
         
         # Sort by relevance score (highest first)
         recommendations.sort(key=lambda x: x.relevance_score, reverse=True)
@@ -134,15 +268,19 @@ class TransportRecommendationService:
         """
         user_type = user_type.lower()
         
+        # Relationship count and speed/capacity from the (cached) facts query
+        facts = self._get_mode_facts(user_type, [transport_mode]).get(transport_mode, {})
+        relationship_bonus = self._relationship_bonus_from_count(facts.get("relationship_count", 0))
+        property_bonus = self._property_bonus_from_values(facts.get("speed"), facts.get("capacity"))
+        
+        return self._combine_scores(user_type, transport_mode, relationship_bonus, property_bonus)
+    
+    def _combine_scores(self, user_type: str, transport_mode: str,
+                        relationship_bonus: float, property_bonus: float) -> float:
+        """Combine the preference weight with the ontology bonuses into a relevance score"""
         # Base score from user preferences
         base_score = self.user_type_preferences.get(user_type, {}).get("weights", {}).get(transport_mode, 0.5)
         
-        # Query semantic relationships to enhance scoring
-        relationship_bonus = self._get_semantic_relationship_bonus(user_type, transport_mode)
-        
-        # Query transport properties for additional scoring factors
-        property_bonus = self._get_property_bonus(transport_mode)
-        
         # Calculate final score (capped at 1.0)
         final_score = min(1.0, base_score + relationship_bonus + property_bonus)
         
@@ -151,6 +289,39 @@ class TransportRecommendationService:
         
         return final_score
     
+    def _run_query(self, query: str) -> Dict[str, Any]:
+        """
+        POST a SELECT query over the keep-alive session and return the decoded JSON results.
+        Concurrent calls with the same query text wait for the first one instead of re-sending it;
+        the shared result must be treated as read-only.
+        """
+        with self._inflight_lock:
+            future = self._inflight.get(query)
+            leader = future is None
+            if leader:
+                future = self._inflight[query] = Future()
+        if not leader:
+            return future.result()
+        
+        try:
+            resp = self._session.post(self.fuseki_endpoint, data={"query": query},
+                                      headers=QUERY_HEADERS, timeout=QUERY_TIMEOUT)
+            resp.raise_for_status()
+            results = json_loads(resp.content)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(results)
+            return results
+        finally:
+            with self._inflight_lock:
+                del self._inflight[query]
+    
+    def ping(self) -> bool:
+        """Cheap ASK against the endpoint; raises on connection/HTTP errors, returns whether the dataset has triples"""
+        return bool(self._run_query("ASK { ?s ?p ?o }").get("boolean"))
+    
     def get_transport_stations_mapping(self) -> Dict[str, List[str]]:
         """
         Get mapping of transport modes to their compatible stations using semantic relationships.
@@ -158,46 +329,24 @@ class TransportRecommendationService:
         Returns:
             Dictionary mapping transport mode names to lists of station names
         """
-        query = f"""PREFIX : <{self.ontology_namespace}>
-PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-
-SELECT DISTINCT ?transportMode ?transportName ?station ?stationName ?stationType
-WHERE {{
-    # Get transport modes
-    ?transport rdf:type ?transportMode .
-    FILTER(?transportMode = :Bike || ?transportMode = :Bus || ?transportMode = :Metro)
-    OPTIONAL {{ ?transport :hasName ?transportName . }}
-    
-    # Get stations and their types
-    ?stationInstance rdf:type ?stationType .
-    FILTER(?stationType = :BikeStation || ?stationType = :BusStation || ?stationType = :MetroStation)
-    OPTIONAL {{ ?stationInstance :hasName ?stationName . }}
-    
-    # Map transport modes to compatible station types
-    BIND(
-        IF(?transportMode = :Bike && ?stationType = :BikeStation, ?stationInstance,
-        IF(?transportMode = :Bus && ?stationType = :BusStation, ?stationInstance,
-        IF(?transportMode = :Metro && ?stationType = :MetroStation, ?stationInstance,
-        ?UNDEF))) AS ?station
-    )
-    
-    FILTER(BOUND(?station))
-}}
-ORDER BY ?transportMode ?station"""
+        with self._cache_lock:
+            cached = self._mapping_cache.get("mapping")
+        if cached is not None:
+            return cached
+        
+        query = self._query_cache[("stations",)]
         
         try:
-            sparql = SPARQLWrapper(self.fuseki_endpoint)
-            sparql.setQuery(query)
-            sparql.setReturnFormat(JSON)
-            results = sparql.query().convert()
+            results = self._run_query(query)
             
             transport_stations = {}
             
-            for binding in results.get("results", {}).get("bindings", []):
+            # Stations are listed in URI order (sorted here rather than by Fuseki)
+            for binding in sorted(_bindings(results), key=lambda b: b["station"]["value"]):
                 transport_mode = self._extract_local_name(binding["transportMode"]["value"])
-                station_name = binding.get("stationName", {}).get("value", 
-                                         self._extract_local_name(binding["station"]["value"]))
+                station_name = _val(binding, "stationName")
+                if station_name is None:
+                    station_name = self._extract_local_name(binding["station"]["value"])
                 
                 if transport_mode not in transport_stations:
                     transport_stations[transport_mode] = []
@@ -206,6 +355,18 @@ ORDER BY ?transportMode ?station"""
                     transport_stations[transport_mode].append(station_name)
             
             logger.info(f"Retrieved transport-station mappings: {len(transport_stations)} transport modes")
+            ns = self.ontology_namespace
+            station_payloads = {
+                mode: json_dumps({
+                    "transportType": mode,
+                    "stations": [{"name": name, "transportType": mode, "uri": ns + name} for name in names],
+                    "total": len(names)
+                })
+                for mode, names in transport_stations.items()
+            }
+            with self._cache_lock:
+                self._mapping_cache["mapping"] = transport_stations
+                self._mapping_cache["station_payloads"] = station_payloads
             return transport_stations
             
         except Exception as e:
@@ -217,154 +378,104 @@ ORDER BY ?transportMode ?station"""
                 "Metro": ["MetroStation1", "MetroStation2"]
             }
     
-    def _get_semantic_relationship_bonus(self, user_type: str, transport_mode: str) -> float:
-        """Get bonus score based on semantic relationships in the ontology"""
-        query = f"""PREFIX : <{self.ontology_namespace}>
-PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-
-SELECT (COUNT(*) as ?relationshipCount)
-WHERE {{
-    ?person rdf:type :{user_type.capitalize()} .
-    ?transport rdf:type :{transport_mode} .
+    def get_station_payload(self, transport_mode: str) -> Optional[bytes]:
+        """
+        Serialized /transport/<type>/stations body for a mode, built when the mapping was cached.
+        Returns None when the mapping isn't cached (e.g. fallback mapping) or the mode has no stations.
+        """
+        with self._cache_lock:
+            station_payloads = self._mapping_cache.get("station_payloads")
+        return station_payloads.get(transport_mode) if station_payloads else None
     
-    # Check for usesTransport relationships
-    OPTIONAL {{ ?person :usesTransport ?transport . }}
-}}"""
-        
-        try:
-            sparql = SPARQLWrapper(self.fuseki_endpoint)
-            sparql.setQuery(query)
-            sparql.setReturnFormat(JSON)
-            results = sparql.query().convert()
-            
-            bindings = results.get("results", {}).get("bindings", [])
-            if bindings:
-                count = int(bindings[0].get("relationshipCount", {}).get("value", "0"))
-                # Convert count to bonus (0.0 to 0.2 range)
-                return min(0.2, count * 0.05)
-            
-        except Exception as e:
-            logger.debug(f"Semantic relationship query failed: {str(e)}")
-        
-        return 0.0
+    def reload_cache(self):
+        """Drop cached station mappings and transport facts so the next calls re-query Fuseki"""
+        with self._cache_lock:
+            self._mapping_cache.clear()
+            self._facts_cache.clear()
+        logger.info("Transport recommendation caches cleared")
     
-    def _get_property_bonus(self, transport_mode: str) -> float:
-        """Get bonus score based on transport mode properties"""
-        query = f"""PREFIX : <{self.ontology_namespace}>
-PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-
-SELECT ?speed ?capacity
-WHERE {{
-    ?transport rdf:type :{transport_mode} .
-    OPTIONAL {{ ?transport :hasSpeed ?speed . }}
-    OPTIONAL {{ ?transport :hasCapacity ?capacity . }}
-}}
-LIMIT 1"""
-        
-        try:
-            sparql = SPARQLWrapper(self.fuseki_endpoint)
-            sparql.setQuery(query)
-            sparql.setReturnFormat(JSON)
-            results = sparql.query().convert()
-            
-            bindings = results.get("results", {}).get("bindings", [])
-            if bindings:
-                binding = bindings[0]
-                speed = binding.get("speed", {}).get("value")
-                capacity = binding.get("capacity", {}).get("value")
-                
-                bonus = 0.0
-                
-                # Speed bonus (higher speed = higher bonus, max 0.1)
-                if speed:
-                    try:
-                        speed_val = float(speed)
-                        bonus += min(0.1, speed_val / 100.0)  # Normalize speed
-                    except ValueError:
-                        pass
-                
-                # Capacity bonus (higher capacity = higher bonus, max 0.1)
-                if capacity:
-                    try:
-                        capacity_val = float(capacity)
-                        bonus += min(0.1, capacity_val / 1000.0)  # Normalize capacity
-                    except ValueError:
-                        pass
-                
-                return bonus
-            
-        except Exception as e:
-            logger.debug(f"Property bonus query failed: {str(e)}")
-        
-        return 0.0
+    @staticmethod
+    def _relationship_bonus_from_count(count: int) -> float:
+        """Convert a usesTransport relationship count to a bonus (0.0 to 0.2 range)"""
+        return min(0.2, count * 0.05)
     
-    def _generate_reasoning(self, user_type: str, transport_mode: str, relevance_score: float) -> str:
-        """Generate human-readable reasoning for the recommendation"""
-        reasoning_templates = {
-            "citizen": {
-                "Bus": "Buses provide reliable public transport for daily commuting with good coverage.",
-                "Metro": "Metro offers fast and efficient transport for urban travel with high frequency.",
-                "Bike": "Bikes provide eco-friendly transport for short to medium distances with health benefits."
-            },
-            "tourist": {
-                "Metro": "Metro provides quick access to major tourist attractions with comprehensive network coverage.",
-                "Bus": "Buses offer scenic routes and access to various tourist destinations throughout the city.",
-                "Bike": "Bikes allow flexible exploration of tourist areas at your own pace."
-            },
-            "staff": {
-                "Bike": "Bikes offer flexible and cost-effective transport for staff with parking convenience.",
-                "Bus": "Buses provide reliable transport for staff commuting with predictable schedules.",
-                "Metro": "Metro offers fast transport for staff working in central business districts."
-            }
-        }
+    @staticmethod
+    def _property_bonus_from_values(speed: Optional[str], capacity: Optional[str]) -> float:
+        """Bonus from raw speed/capacity literal values (each capped at 0.1)"""
+        bonus = 0.0
         
-        base_reasoning = reasoning_templates.get(user_type, {}).get(transport_mode, 
-                                                f"{transport_mode} is suitable for {user_type} users.")
+        # Speed bonus (higher speed = higher bonus, max 0.1)
+        if speed:
+            try:
+                speed_val = float(speed)
+                bonus += min(0.1, speed_val / 100.0)  # Normalize speed
+            except ValueError:
+                pass
         
-        # Add score-based qualifier
-        if relevance_score >= 0.8:
-            qualifier = "Highly recommended: "
-        elif relevance_score >= 0.6:
-            qualifier = "Recommended: "
-        else:
-            qualifier = "Consider: "
+        # Capacity bonus (higher capacity = higher bonus, max 0.1)
+        if capacity:
+            try:
+                capacity_val = float(capacity)
+                bonus += min(0.1, capacity_val / 1000.0)  # Normalize capacity
+            except ValueError:
+                pass
         
-        return qualifier + base_reasoning
+        return bonus
     
-    def _get_transport_properties(self, transport_mode: str) -> Dict[str, Any]:
-        """Get additional properties for a transport mode"""
-        query = f"""PREFIX : <{self.ontology_namespace}>
-PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-
-SELECT ?property ?value
-WHERE {{
-    ?transport rdf:type :{transport_mode} .
-    ?transport ?property ?value .
-    FILTER(?property != rdf:type)
-}}"""
+    def _get_mode_facts(self, user_type: str, transport_modes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetch everything the scoring needs for several transport modes in a single query:
+        usesTransport relationship count for the user type, a sample speed/capacity and
+        the mode's properties. Returns {mode: {"relationship_count", "speed", "capacity", "properties"}};
+        modes missing from the result (or all modes, if the query fails) get no bonus and no properties.
+        Successful results are cached for QUERY_CACHE_TTL seconds.
+        """
+        key = (user_type, tuple(transport_modes))
+        with self._cache_lock:
+            cached = self._facts_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        query = self._query_cache.get(("facts",) + key) or self._mode_facts_query(user_type, transport_modes)
         
         try:
-            sparql = SPARQLWrapper(self.fuseki_endpoint)
-            sparql.setQuery(query)
-            sparql.setReturnFormat(JSON)
-            results = sparql.query().convert()
-            
-            properties = {}
-            for binding in results.get("results", {}).get("bindings", []):
-                prop_name = self._extract_local_name(binding["property"]["value"])
-                prop_value = binding["value"]["value"]
-                properties[prop_name] = prop_value
-            
-            return properties
-            
+            results = self._run_query(query)
         except Exception as e:
-            logger.debug(f"Properties query failed: {str(e)}")
+            logger.debug(f"Transport facts query failed: {str(e)}")
             return {}
+        
+        facts = {mode: {"relationship_count": 0, "speed": None, "capacity": None, "properties": {}}
+                 for mode in transport_modes}
+        for binding in _bindings(results):
+            mode_facts = facts.get(self._extract_local_name(binding["mode"]["value"]))
+            if mode_facts is None:
+                continue
+            if "relationshipCount" in binding:
+                mode_facts["relationship_count"] = int(binding["relationshipCount"]["value"])
+            elif "property" in binding:
+                prop_name = self._extract_local_name(binding["property"]["value"])
+                mode_facts["properties"][prop_name] = binding["value"]["value"]
+            else:
+                mode_facts["speed"] = _val(binding, "speed")
+                mode_facts["capacity"] = _val(binding, "capacity")
+        
+        with self._cache_lock:
+            self._facts_cache[key] = facts
+        return facts
+    
+    @staticmethod
+    def _score_qualifier(relevance_score: float) -> str:
+        """Score-based prefix of the reasoning text"""
+        if relevance_score >= 0.8:
+            return "Highly recommended: "
+        elif relevance_score >= 0.6:
+            return "Recommended: "
+        return "Consider: "
     
     def _extract_local_name(self, uri: str) -> str:
         """Extract local name from URI for display purposes"""
-        if '#' in uri:
-            return uri.split('#')[-1]
-        elif '/' in uri:
-            return uri.split('/')[-1]
-        return uri
\ No newline at end of file
+        i = uri.rfind('#')
+        if i >= 0:
+            return uri[i + 1:]
+        j = uri.rfind('/')
+        return uri[j + 1:] if j >= 0 else uri
\ No newline at end of file
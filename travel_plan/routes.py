@@ -1,25 +1,44 @@
+import gzip
 import os
-from flask import Blueprint, jsonify, request
+import re
+import threading
+from hashlib import blake2b
+from cachetools import TTLCache
+from flask import Blueprint, Response, request, stream_with_context
 try:
-    from SPARQLWrapper import SPARQLWrapper, JSON
+    from orjson import dumps as json_dumps, loads as json_loads
 except ImportError:
-    # Fallback for testing without SPARQLWrapper
-    class SPARQLWrapper:
-        def __init__(self, endpoint): pass
-        def setQuery(self, query): pass
-        def setReturnFormat(self, format): pass
-        def query(self): 
-            class MockResult:
-                def convert(self): return {"results": {"bindings": []}}
-            return MockResult()
-    JSON = "json"
-
-from sparql_service import get_sparql_service
+    import json
+    from json import loads as json_loads
+
+    def json_dumps(obj):
+        return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+from sparql_service import escape_sparql_literal, get_sparql_service
+
+# Keep-alive connections kept per Fuseki host; match it to the number of threads serving
+# requests so concurrent handlers each reuse a warm connection instead of opening a new one
+FUSEKI_POOL_MAXSIZE = int(os.getenv('FUSEKI_POOL_MAXSIZE', '32'))
 
 # Robust import for requests (fallback to urllib shim if not installed)
 try:
     import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    # Shared HTTP session so queries and updates reuse pooled keep-alive connections to Fuseki
+    _session = requests.Session()
+    _session.headers.update({"Connection": "keep-alive", "Accept-Encoding": "gzip"})
+    _adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=FUSEKI_POOL_MAXSIZE,
+        max_retries=Retry(total=2, backoff_factor=0.1, status_forcelist=[502, 503, 504])
+    )
+    _session.mount("http://", _adapter)
+    _session.mount("https://", _adapter)
 except Exception:
+    import json as _json
+    import urllib.parse as _up
     import urllib.request as _ur
     import urllib.error as _ue
 
@@ -27,13 +46,21 @@ except Exception:
         def __init__(self, code, text):
             self.status_code = code
             self.text = text
+            self.content = text.encode('utf-8')
+
+        def json(self):
+            return _json.loads(self.text)
 
     class _SimpleRequests:
         @staticmethod
         def post(url, data, headers=None, timeout=None):
+            headers = dict(headers or {})
+            if isinstance(data, dict):
+                data = _up.urlencode(data)
+                headers.setdefault("Content-Type", "application/x-www-form-urlencoded")
             if isinstance(data, str):
                 data = data.encode('utf-8')
-            req = _ur.Request(url, data=data, headers=headers or {}, method='POST')
+            req = _ur.Request(url, data=data, headers=headers, method='POST')
             try:
                 with _ur.urlopen(req, timeout=timeout) as resp:
                     return _SimpleResponse(resp.getcode(), resp.read().decode('utf-8'))
@@ -46,29 +73,194 @@ except Exception:
                 return _SimpleResponse(getattr(e, "code", 500), body)
 
     requests = _SimpleRequests()
-
-router = Blueprint('travel_plan', __name__)
+    _session = requests
 
 # Fuseki endpoints - use environment variables from docker-compose
 FUSEKI_ENDPOINT = os.getenv('FUSEKI_QUERY', "http://localhost:3030/smartcity/query")
 FUSEKI_UPDATE = os.getenv('FUSEKI_UPDATE', "http://localhost:3030/smartcity/update")
 
+# Optional HTTP/2 client (httpx[http2]) multiplexing concurrent queries over one connection.
+# Opt-in: Fuseki's Jetty only speaks HTTP/1.1, so FUSEKI_QUERY/FUSEKI_UPDATE must point at an
+# https:// proxy that terminates HTTP/2. httpx negotiates HTTP/2 through TLS ALPN only: against
+# plain http:// URLs (the default endpoints) it keeps using HTTP/1.1
+FUSEKI_HTTP2 = os.getenv('FUSEKI_HTTP2', '0') == '1'
+if FUSEKI_HTTP2:
+    try:
+        import httpx
+
+        class _Http2Session:
+            """requests-style post() over a shared httpx HTTP/2 client"""
+
+            def __init__(self):
+                self._client = httpx.Client(
+                    http2=True,
+                    limits=httpx.Limits(max_connections=FUSEKI_POOL_MAXSIZE, max_keepalive_connections=16),
+                    headers={"Accept-Encoding": "gzip"},
+                    timeout=10.0,
+                )
+
+            def post(self, url, data=None, headers=None, timeout=None):
+                if isinstance(data, dict):
+                    return self._client.post(url, data=data, headers=headers, timeout=timeout)
+                return self._client.post(url, content=data, headers=headers, timeout=timeout)
+
+        _session = _Http2Session()
+        if not (FUSEKI_ENDPOINT.startswith("https://") and FUSEKI_UPDATE.startswith("https://")):
+            print("[travel_plan] FUSEKI_HTTP2=1 but the Fuseki endpoints are not https://; "
+                  "HTTP/2 is only negotiated over TLS, so these requests stay on HTTP/1.1")
+    except ImportError:
+        print("[travel_plan] FUSEKI_HTTP2=1 but httpx[http2] is not installed; using HTTP/1.1")
+
+router = Blueprint('travel_plan', __name__)
+
 # Get enhanced SPARQL service instance
 sparql_service = get_sparql_service(FUSEKI_ENDPOINT)
 
+# Serialized GET responses and their ETags, keyed by (endpoint, args); cleared when a plan is created
+RESPONSE_CACHE_TTL = 5
+_cache = TTLCache(maxsize=256, ttl=RESPONSE_CACHE_TTL)
+_cache_lock = threading.Lock()
+
+def json_response(obj, status=200):
+    """Serialize obj (orjson when available) into a JSON response"""
+    return Response(json_dumps(obj), status=status, mimetype="application/json")
+
+def _etag(body):
+    """Short content hash of a serialized body, used as its ETag"""
+    return blake2b(body, digest_size=8).hexdigest()
+
+def _body_response(body, etag):
+    """JSON response for a serialized body, or 304 when the client already has this ETag"""
+    if request.if_none_match.contains(etag):
+        resp = Response(status=304)
+    else:
+        resp = Response(body, mimetype="application/json")
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = f"max-age={RESPONSE_CACHE_TTL}"
+    return resp
+
+def _cached_response(key):
+    """Cached JSON body for key as a Response (or 304), or None"""
+    with _cache_lock:
+        entry = _cache.get(key)
+    return _body_response(*entry) if entry is not None else None
+
+def _cache_response(key, payload):
+    """Serialize payload, store it (with its ETag) under key and return it as a Response"""
+    body = json_dumps(payload)
+    etag = _etag(body)
+    with _cache_lock:
+        _cache[key] = (body, etag)
+    return _body_response(body, etag)
+
+NS = "http://www.semanticweb.org/monpc/ontologies/2025/9/untitled-ontology-4#"
+
+# TravelPlan classes, bound up front with VALUES so Fuseki probes its type index per class
+PLAN_TYPES = ("SingleTripPlan", "DailyCommutePlan", "WeeklyPlan", "SeasonalPlan", "TourPlan", "TravelPlan")
+_ALLOWED_CLASSES = frozenset(NS + t for t in PLAN_TYPES)
+_TYPE_VALUES = "VALUES ?type { " + " ".join(f"sc:{t}" for t in PLAN_TYPES) + " }"
+
+def _pair_sample(node, name, alias):
+    """
+    SELECT aggregate sampling one "<node IRI>\\t<name>" string per plan (just the IRI when the
+    node has no name), so the IRI and name of a group always come from the same node even
+    when a plan has several of them. Split back by _plan_from_binding.
+    """
+    return f'(SAMPLE(CONCAT(STR(?{node}), COALESCE(CONCAT("\\t", STR(?{name})), ""))) AS ?{alias})'
+
+# OPTIONAL joins of the plan queries: group -> ((IRI column, name column), SELECT aggregate, pattern)
+_PLAN_GROUPS = {
+    "person": (("person", "personName"), _pair_sample("p", "pName", "personPair"), """
+  OPTIONAL {
+    ?p sc:hasTravelPlan ?plan .
+    OPTIONAL { ?p sc:hasName ?pName . }
+  }"""),
+    "start": (("startStation", "startStationName"), _pair_sample("start", "startName", "startPair"), """
+  OPTIONAL {
+    ?plan sc:hasStartStation ?start .
+    OPTIONAL { ?start sc:hasName ?startName . }
+  }"""),
+    "end": (("endStation", "endStationName"), _pair_sample("end", "endName", "endPair"), """
+  OPTIONAL {
+    ?plan sc:hasEndStation ?end .
+    OPTIONAL { ?end sc:hasName ?endName . }
+  }"""),
+    "mode": (("transportMode", "transportModeName"), _pair_sample("mode", "modeName", "modePair"), """
+  OPTIONAL {
+    ?plan sc:usesTransportMode ?mode .
+    OPTIONAL { ?mode sc:hasName ?modeName . }
+  }"""),
+}
+# Column requested through fields= -> OPTIONAL group that binds it
+_FIELD_GROUP = {col: group for group, (cols, _, _) in _PLAN_GROUPS.items() for col in cols}
+# Sampled pair variable -> (IRI column, name column)
+_PAIR_COLS = {f"{group}Pair": cols for group, (cols, _, _) in _PLAN_GROUPS.items()}
+
+def _plan_query_head(groups):
+    """PREFIX/SELECT/WHERE opening of a plan query projecting the given OPTIONAL groups"""
+    aggregates = "".join(f"\n       {_PLAN_GROUPS[g][1]}" for g in groups)
+    return f"""
+PREFIX sc: <{NS}>
+PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+
+SELECT ?plan ?type{aggregates}
+WHERE {{
+"""
+
+def _plan_optionals(groups):
+    """OPTIONAL blocks of the given groups"""
+    return "".join(_PLAN_GROUPS[g][2] for g in groups) + "\n"
+
+# Travel plan query templates, built once: handlers only splice in the filter / plan clause
+_PLAN_QUERY_HEAD = _plan_query_head(_PLAN_GROUPS)
+_PLAN_TYPE_PATTERN = f"""
+  {_TYPE_VALUES}
+  ?plan rdf:type ?type .
+"""
+_PLAN_OPTIONALS = _plan_optionals(_PLAN_GROUPS)
+_LIST_QUERY_PREFIX = _PLAN_QUERY_HEAD + _PLAN_TYPE_PATTERN + _PLAN_OPTIONALS + "  "
+_LIST_QUERY_SUFFIX = """
+}
+GROUP BY ?plan ?type
+ORDER BY ?plan
+"""
+_GET_QUERY_PREFIX = _PLAN_QUERY_HEAD + "  "
+_GET_QUERY_SUFFIX = _PLAN_TYPE_PATTERN + _PLAN_OPTIONALS + """}
+GROUP BY ?plan ?type
+LIMIT 1
+"""
+
+# Accepted values of the list filter parameter q; nothing here needs escaping
+# inside a double-quoted SPARQL literal
+_Q_RE = re.compile(r"[\w \-\.]{0,64}")
+
+# Accepted plan localnames; safe both as an IRI suffix and inside a literal
+_LN_RE = re.compile(r"[A-Za-z_][\w\-\.]{0,128}")
+
+# Characters that may not appear in an IRI written between <...> (they could close it
+# and inject triples): the SPARQL IRIREF exclusions, whitespace and control characters
+_BAD_IRI_RE = re.compile(r'[<>"{}|^`\\\x00-\x20\x7f]')
+
+def _valid_iri(value):
+    """True if value is a non-empty string safe to write between <...>"""
+    return isinstance(value, str) and bool(value) and not _BAD_IRI_RE.search(value)
+
+# Read timeout (seconds) of plan queries; full plan listings with every join can be slow
+QUERY_TIMEOUT = 30
+
 def execute_sparql_query(query):
     """Enhanced SPARQL query execution with validation and timeout"""
     try:
-        # Direct query execution to bypass service issues
-        import requests
-        response = requests.get(
+        # Direct query execution over the pooled session
+        response = _session.post(
             FUSEKI_ENDPOINT,
-            params={'query': query, 'format': 'json'},
-            timeout=30
+            data={'query': query},
+            headers={'Accept': 'application/sparql-results+json'},
+            timeout=QUERY_TIMEOUT
         )
         
         if response.status_code == 200:
-            return response.json()
+            return json_loads(response.content)
         else:
             print(f"[travel_plan] Direct SPARQL error: {response.status_code} - {response.text}")
             return None
@@ -77,149 +269,283 @@ def execute_sparql_query(query):
         print(f"[travel_plan] Exception: {str(e)}")
         return None
 
+# Plan fields copied from the query bindings (besides "uri", taken from ?plan)
+_PLAN_COLS = ("type", "person", "personName", "startStation", "startStationName",
+              "endStation", "endStationName", "transportMode", "transportModeName")
+# fields= names bound by the base pattern (?plan, ?type): valid without any OPTIONAL join
+_BASE_FIELDS = frozenset(("uri", "type"))
+
+def _plan_from_binding(b, cols=_PLAN_COLS):
+    """Plan dict of one result row restricted to cols; unbound columns are None"""
+    values = {k: v["value"] for k, v in b.items()}
+    for pair_var, (iri_col, name_col) in _PAIR_COLS.items():
+        pair = values.pop(pair_var, None)
+        if pair is not None:
+            iri, sep, name = pair.partition("\t")
+            values[iri_col] = iri
+            if sep:
+                values[name_col] = name
+    return {"uri": values["plan"], **{k: values.get(k) for k in cols}}
+
+def _stream_plans(cache_key, bindings, cols=_PLAN_COLS):
+    """
+    Yield {"plans": [...]} one plan at a time as bindings are converted,
+    then cache the complete body under cache_key (later hits get an ETag).
+    """
+    chunks = [b'{"plans":[']
+    yield chunks[0]
+    for index, b in enumerate(bindings):
+        chunk = json_dumps(_plan_from_binding(b, cols))
+        if index:
+            chunk = b',' + chunk
+        chunks.append(chunk)
+        yield chunk
+    chunks.append(b']}')
+    yield chunks[-1]
+    body = b''.join(chunks)
+    with _cache_lock:
+        _cache[cache_key] = (body, _etag(body))
+
 @router.route('/', methods=['GET'])
 def list_travel_plans():
     """
     GET /api/travel-plans/
     Query: select individuals of TravelPlan classes (SingleTripPlan, DailyCommutePlan, WeeklyPlan, SeasonalPlan, TourPlan)
     Optional params:
-      - q : filter by related properties (person name, station name, etc.)
+      - q : filter by related properties (person name, station name, etc.);
+            case-insensitive substring, letters/digits/spaces/'_'/'-'/'.' only, max 64 chars
+      - prefix=1 : match q as a prefix of the name instead of a substring
+      - fields : comma-separated plan columns to return (e.g. type,personName); only the
+                 OPTIONAL joins they need are queried. "uri" is always returned (and may be
+                 listed). Default: all columns
       - debug=1 : include diagnostic info
     """
-    q = request.args.get('q', '').replace('"', '\\"')
+    q = request.args.get('q', '')
     debug = request.args.get('debug', '0') == '1'
+    prefix = request.args.get('prefix', '0') == '1'
+
+    if not _Q_RE.fullmatch(q):
+        return json_response({"error": "q must be at most 64 letters, digits, spaces, '_', '-' or '.'"}, 400)
+    q = q.lower()
+
+    fields = [f for f in request.args.get('fields', '').split(',') if f]
+    if fields:
+        unknown = [f for f in fields if f not in _BASE_FIELDS and f not in _FIELD_GROUP]
+        if unknown:
+            return json_response({"error": f"unknown fields: {', '.join(unknown)}", "allowed": ["uri", *_PLAN_COLS]}, 400)
+        cols = tuple(c for c in _PLAN_COLS if c in fields)
+    else:
+        cols = _PLAN_COLS
 
-    ns = "http://www.semanticweb.org/monpc/ontologies/2025/9/untitled-ontology-4#"
-    filter_clause = f'FILTER regex(str(?personName), "{q}", "i")' if q else ""
+    cache_key = ("list", q, prefix, debug, cols)
+    cached = _cached_response(cache_key)
+    if cached is not None:
+        return cached
+
+    # Case-insensitive substring (or prefix) match on the person name instead of a regex scan
+    if q:
+        match_fn = "STRSTARTS" if prefix else "CONTAINS"
+        filter_clause = f'FILTER({match_fn}(LCASE(str(?pName)), "{q}"))'
+    else:
+        filter_clause = ""
 
     # Primary SPARQL: match all TravelPlan subclasses (simplified for our data)
-    primary_q = f"""
-    PREFIX sc: <{ns}>
-    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-
-    SELECT ?plan ?type ?person ?personName ?startStation ?startStationName ?endStation ?endStationName 
-           ?transportMode ?transportModeName
-    WHERE {{
-      ?plan rdf:type ?type .
-      FILTER(?type = sc:SingleTripPlan || ?type = sc:DailyCommutePlan || ?type = sc:WeeklyPlan || ?type = sc:TravelPlan)
-      
-      OPTIONAL {{ 
-        ?person sc:hasTravelPlan ?plan .
-        OPTIONAL {{ ?person sc:hasName ?personName . }}
-      }}
-      OPTIONAL {{ 
-        ?plan sc:hasStartStation ?startStation . 
-        OPTIONAL {{ ?startStation sc:hasName ?startStationName . }}
-      }}
-      OPTIONAL {{ 
-        ?plan sc:hasEndStation ?endStation . 
-        OPTIONAL {{ ?endStation sc:hasName ?endStationName . }}
-      }}
-      OPTIONAL {{ 
-        ?plan sc:usesTransportMode ?transportMode . 
-        OPTIONAL {{ ?transportMode sc:hasName ?transportModeName . }}
-      }}
-      
-      {filter_clause}
-    }}
-    ORDER BY ?plan
-    """
+    if cols is _PLAN_COLS:
+        primary_q = _LIST_QUERY_PREFIX + filter_clause + _LIST_QUERY_SUFFIX
+    else:
+        # Narrowed query: only the groups of the requested columns (the q filter needs ?pName)
+        groups = [g for g in _PLAN_GROUPS if (g == "person" and q) or any(_FIELD_GROUP.get(c) == g for c in cols)]
+        primary_q = (_plan_query_head(groups) + _PLAN_TYPE_PATTERN + _plan_optionals(groups) + "  "
+                     + filter_clause + _LIST_QUERY_SUFFIX)
     print("[travel_plan] Running TravelPlan query")
     print(primary_q)
     results = execute_sparql_query(primary_q)
     bindings = results.get("results", {}).get("bindings", []) if results else []
 
     if bindings:
-        plans = []
-        for b in bindings:
-            plans.append({
-                "uri": b["plan"]["value"],
-                "type": b.get("type", {}).get("value"),
-                "person": b.get("person", {}).get("value"),
-                "personName": b.get("personName", {}).get("value"),
-                "startStation": b.get("startStation", {}).get("value"),
-                "startStationName": b.get("startStationName", {}).get("value"),
-                "endStation": b.get("endStation", {}).get("value"),
-                "endStationName": b.get("endStationName", {}).get("value"),
-                "transportMode": b.get("transportMode", {}).get("value"),
-                "transportModeName": b.get("transportModeName", {}).get("value")
-            })
-        resp = {"plans": plans}
-        return jsonify(resp)
+        return Response(stream_with_context(_stream_plans(cache_key, bindings, cols)), mimetype="application/json")
 
     # fallback: return empty with debug info if requested
     resp = {"plans": []}
     if debug:
         resp["_query"] = primary_q
-    return jsonify(resp), 200
+    if results is None:
+        # Query failed: don't cache the empty fallback
+        return json_response(resp, 200)
+    return _cache_response(cache_key, resp)
 
 @router.route('/<path:localname>', methods=['GET'])
 def get_travel_plan(localname):
     """
     GET /api/travel-plans/<localname>
-    Fetch a specific travel plan by its localname
-    """
-    q_local = localname.replace('"', '\\"')
-    ns = "http://www.semanticweb.org/monpc/ontologies/2025/9/untitled-ontology-4#"
-
-    single_q = f"""
-    PREFIX sc: <{ns}>
-    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-    
-    SELECT ?plan ?type ?person ?personName ?startStation ?startStationName ?endStation ?endStationName 
-           ?transportMode ?transportModeName
-    WHERE {{
-      ?plan rdf:type ?type .
-      FILTER(?type = sc:SingleTripPlan || ?type = sc:DailyCommutePlan || ?type = sc:WeeklyPlan || ?type = sc:TravelPlan)
-      FILTER(strafter(str(?plan), "#") = "{q_local}" || strends(str(?plan), "/{q_local}"))
-      
-      OPTIONAL {{ 
-        ?person sc:hasTravelPlan ?plan .
-        OPTIONAL {{ ?person sc:hasName ?personName . }}
-      }}
-      OPTIONAL {{ 
-        ?plan sc:hasStartStation ?startStation . 
-        OPTIONAL {{ ?startStation sc:hasName ?startStationName . }}
-      }}
-      OPTIONAL {{ 
-        ?plan sc:hasEndStation ?endStation . 
-        OPTIONAL {{ ?endStation sc:hasName ?endStationName . }}
-      }}
-      OPTIONAL {{ 
-        ?plan sc:usesTransportMode ?transportMode . 
-        OPTIONAL {{ ?transportMode sc:hasName ?transportModeName . }}
-      }}
-    }}
-    LIMIT 1
+    Fetch a specific travel plan by its localname (plans in the ontology namespace NS)
     """
+    if not _LN_RE.fullmatch(localname):
+        return json_response({"error": "invalid localname"}, 400)
+
+    cache_key = ("get", localname)
+    cached = _cached_response(cache_key)
+    if cached is not None:
+        return cached
+
+    # Plans that were just looked up and not found; cleared with the cache when a plan is created
+    miss_key = ("missing", localname)
+    with _cache_lock:
+        missing = miss_key in _cache
+    if missing:
+        return json_response({"error": "Not found"}, 404)
+
+    # Ground IRI lookup: Fuseki probes the plan directly instead of scanning every plan URI
+    single_q = _GET_QUERY_PREFIX + f"VALUES ?plan {{ <{NS}{localname}> }}" + _GET_QUERY_SUFFIX
     res = execute_sparql_query(single_q)
     binds = res.get("results", {}).get("bindings", []) if res else []
-    
+
     if binds:
-        b = binds[0]
-        return jsonify({
-            "uri": b["plan"]["value"],
-            "type": b.get("type", {}).get("value"),
-            "person": b.get("person", {}).get("value"),
-            "personName": b.get("personName", {}).get("value"),
-            "startStation": b.get("startStation", {}).get("value"),
-            "startStationName": b.get("startStationName", {}).get("value"),
-            "endStation": b.get("endStation", {}).get("value"),
-            "endStationName": b.get("endStationName", {}).get("value"),
-            "transportMode": b.get("transportMode", {}).get("value"),
-            "transportModeName": b.get("transportModeName", {}).get("value")
-        })
-
-    return jsonify({"error": "Not found"}), 404
+        return _cache_response(cache_key, _plan_from_binding(binds[0]))
+
+    if res is not None:
+        with _cache_lock:
+            _cache[miss_key] = True
+    return json_response({"error": "Not found"}, 404)
+
+# Upper bound on plans per batch POST (one INSERT DATA request)
+MAX_BATCH_PLANS = 200
+
+_UPDATE_HEADERS = {"Content-Type": "application/sparql-update", "Connection": "keep-alive"}
+
+# Gzip update bodies of at least GZIP_UPDATE_MIN_BYTES; opt-in since the Fuseki
+# server (or proxy in front of it) has to accept Content-Encoding: gzip requests
+FUSEKI_GZIP_UPDATES = os.getenv('FUSEKI_GZIP_UPDATES', '0') == '1'
+GZIP_UPDATE_MIN_BYTES = 1024
+_GZIP_UPDATE_HEADERS = {**_UPDATE_HEADERS, "Content-Encoding": "gzip"}
+
+def _post_update(body):
+    """POST an encoded SPARQL update to Fuseki, gzip-compressed when enabled and large enough"""
+    if FUSEKI_GZIP_UPDATES and len(body) >= GZIP_UPDATE_MIN_BYTES:
+        return _session.post(FUSEKI_UPDATE, data=gzip.compress(body), headers=_GZIP_UPDATE_HEADERS, timeout=10)
+    return _session.post(FUSEKI_UPDATE, data=body, headers=_UPDATE_HEADERS, timeout=10)
+
+# Predicate/datatype IRIs of the INSERT DATA triples, encoded once
+_P_HASTRAVELPLAN = f"<{NS}hasTravelPlan>".encode()
+_P_HASSTARTSTATION = f"<{NS}hasStartStation>".encode()
+_P_HASENDSTATION = f"<{NS}hasEndStation>".encode()
+_P_USESTRANSPORTMODE = f"<{NS}usesTransportMode>".encode()
+_P_HASSTARTTIME = f"<{NS}hasStartTime>".encode()
+_P_HASENDTIME = f"<{NS}hasEndTime>".encode()
+_P_HASDAYSOFWEEK = f"<{NS}hasDaysOfWeek>".encode()
+_P_ISACTIVE = f"<{NS}isActive>".encode()
+_XSD_TIME = b"^^<http://www.w3.org/2001/XMLSchema#time>"
+_XSD_BOOLEAN = b"^^<http://www.w3.org/2001/XMLSchema#boolean>"
+
+def _write_plan_triples(buf, data):
+    """
+    Append the INSERT DATA triples of one plan (request body fields) to buf.
+    Returns (uri, None), or (None, error message) if a required field is missing or invalid;
+    nothing is appended to buf in that case.
+    """
+    uri = data.get("uri")
+    localname = data.get("localname")
+    class_uri = data.get("class")
+
+    if not uri:
+        if not localname:
+            return None, "uri or localname required"
+        if not isinstance(localname, str) or not _LN_RE.fullmatch(localname):
+            return None, "invalid localname"
+        uri = NS + localname
+    elif not _valid_iri(uri):
+        return None, "invalid uri"
+
+    if not class_uri:
+        return None, "class required (e.g., SingleTripPlan, DailyCommutePlan)"
+    if class_uri in PLAN_TYPES:
+        class_uri = NS + class_uri
+    if not isinstance(class_uri, str) or class_uri not in _ALLOWED_CLASSES:
+        return None, f"unsupported class (expected one of: {', '.join(PLAN_TYPES)})"
+
+    for key in ("person", "startStation", "endStation", "transportMode"):
+        value = data.get(key)
+        if value and not _valid_iri(value):
+            return None, f"invalid {key} IRI"
+
+    subject = f"<{uri}> ".encode()
+    buf += subject + b"a <" + class_uri.encode() + b"> .\n"
+
+    # Object properties
+    person = data.get("person")
+    if person:
+        buf += b"<" + person.encode() + b"> " + _P_HASTRAVELPLAN + b" " + subject + b".\n"
+    for key, predicate in (("startStation", _P_HASSTARTSTATION), ("endStation", _P_HASENDSTATION),
+                           ("transportMode", _P_USESTRANSPORTMODE)):
+        value = data.get(key)
+        if value:
+            buf += subject + predicate + b" <" + value.encode() + b"> .\n"
+
+    # Data properties
+    for key, predicate, datatype in (("startTime", _P_HASSTARTTIME, _XSD_TIME), ("endTime", _P_HASENDTIME, _XSD_TIME),
+                                     ("daysOfWeek", _P_HASDAYSOFWEEK, b"")):
+        value = data.get(key)
+        if value is not None:
+            buf += subject + predicate + b' "' + escape_sparql_literal(value).encode() + b'"' + datatype + b" .\n"
+
+    is_active = data.get("isActive")
+    if is_active is not None:
+        buf += subject + _P_ISACTIVE + (b' "true"' if is_active else b' "false"') + _XSD_BOOLEAN + b" .\n"
+
+    return uri, None
+
+def _create_travel_plans_batch(items):
+    """
+    Write a list of plans (same fields as a single POST) with one INSERT DATA request.
+    Returns 207 with one {"index", "ok", "uri"|"error"} entry per plan.
+    """
+    if not items:
+        return json_response({"error": "plan list must not be empty"}, 400)
+    if len(items) > MAX_BATCH_PLANS:
+        return json_response({"error": f"At most {MAX_BATCH_PLANS} plans per request"}, 400)
+
+    results = [None] * len(items)
+    written = []
+    buf = bytearray(b"INSERT DATA {\n")
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results[index] = {"index": index, "ok": False, "error": "plan must be an object"}
+            continue
+        uri, error = _write_plan_triples(buf, item)
+        if error:
+            results[index] = {"index": index, "ok": False, "error": error}
+            continue
+        results[index] = {"index": index, "ok": True, "uri": uri}
+        written.append(index)
+    buf += b"}"
+
+    if written:
+        try:
+            resp = _post_update(bytes(buf))
+            if resp.status_code in (200, 201, 204):
+                with _cache_lock:
+                    _cache.clear()
+                error = None
+            else:
+                error = f"Fuseki update failed (status {resp.status_code})"
+        except Exception as e:
+            error = f"Update error: {str(e)}"
+        if error:
+            for index in written:
+                results[index] = {"index": index, "ok": False, "error": error}
+
+    return json_response({"results": results}, 207)
 
 @router.route('/', methods=['POST'])
 def create_travel_plan():
     """
     POST /api/travel-plans/
+    The body may also be a list of such objects: they are written with a single
+    INSERT DATA request and a 207 with one {"index", "ok", "uri"|"error"} entry per plan is returned.
     JSON body fields:
       - uri (optional) : full URI for the new individual
       - localname (optional) : local name to append to ontology base (used if uri not provided)
-      - class (required) : class URI (SingleTripPlan, DailyCommutePlan, etc.)
+      - class (required) : class URI or local name, one of PLAN_TYPES (SingleTripPlan, DailyCommutePlan, etc.)
       - person (optional) : person URI that has this plan
       - startStation (optional) : start station URI
       - endStation (optional) : end station URI
@@ -238,72 +564,26 @@ def create_travel_plan():
         "isActive": true
       }
     """
-    data = request.get_json() or {}
-    uri = data.get("uri")
-    localname = data.get("localname")
-    class_uri = data.get("class")
-    person = data.get("person")
-    start_station = data.get("startStation")
-    end_station = data.get("endStation")
-    transport_mode = data.get("transportMode")
-    start_time = data.get("startTime")
-    end_time = data.get("endTime")
-    days_of_week = data.get("daysOfWeek")
-    is_active = data.get("isActive")
-
-    base_uri = "http://www.semanticweb.org/monpc/ontologies/2025/9/untitled-ontology-4#"
-
-    if not uri:
-        if not localname:
-            return jsonify({"error": "uri or localname required"}), 400
-        uri = base_uri + localname
-
-    if not class_uri:
-        return jsonify({"error": "class required (e.g., SingleTripPlan, DailyCommutePlan)"}), 400
-
-    triples = []
-    triples.append(f"<{uri}> a <{class_uri}> .")
-
-    # Object properties
-    if person:
-        triples.append(f"<{person}> <{base_uri}hasTravelPlan> <{uri}> .")
-    
-    if start_station:
-        triples.append(f"<{uri}> <{base_uri}hasStartStation> <{start_station}> .")
-    
-    if end_station:
-        triples.append(f"<{uri}> <{base_uri}hasEndStation> <{end_station}> .")
-    
-    if transport_mode:
-        triples.append(f"<{uri}> <{base_uri}usesTransportMode> <{transport_mode}> .")
-
-    # Data properties
-    if start_time is not None:
-        safe_time = start_time.replace('"', '\\"')
-        triples.append(f'<{uri}> <{base_uri}hasStartTime> "{safe_time}"^^<http://www.w3.org/2001/XMLSchema#time> .')
-    
-    if end_time is not None:
-        safe_time = end_time.replace('"', '\\"')
-        triples.append(f'<{uri}> <{base_uri}hasEndTime> "{safe_time}"^^<http://www.w3.org/2001/XMLSchema#time> .')
-    
-    if days_of_week is not None:
-        safe_days = days_of_week.replace('"', '\\"')
-        triples.append(f'<{uri}> <{base_uri}hasDaysOfWeek> "{safe_days}" .')
-    
-    if is_active is not None:
-        bool_val = "true" if is_active else "false"
-        triples.append(f'<{uri}> <{base_uri}isActive> "{bool_val}"^^<http://www.w3.org/2001/XMLSchema#boolean> .')
+    data = request.get_json()
+    if isinstance(data, list):
+        return _create_travel_plans_batch(data)
+    data = data or {}
 
-    update_query = "INSERT DATA { \n" + "\n".join(triples) + "\n }"
+    buf = bytearray(b"INSERT DATA {\n")
+    uri, error = _write_plan_triples(buf, data)
+    if error:
+        return json_response({"error": error}, 400)
+    buf += b"}"
 
     try:
-        headers = {"Content-Type": "application/sparql-update"}
-        resp = requests.post(FUSEKI_UPDATE, data=update_query.encode('utf-8'), headers=headers, timeout=10)
+        resp = _post_update(bytes(buf))
         if resp.status_code in (200, 201, 204):
-            return jsonify({"ok": True, "uri": uri}), 201
+            with _cache_lock:
+                _cache.clear()
+            return json_response({"ok": True, "uri": uri}, 201)
         else:
-            return jsonify({"error": "Fuseki update failed", "status": resp.status_code, "body": resp.text}), 500
+            return json_response({"error": "Fuseki update failed", "status": resp.status_code, "body": resp.text}, 500)
     except Exception as e:
-        return jsonify({"error": f"Update error: {str(e)}"}), 500
+        return json_response({"error": f"Update error: {str(e)}"}, 500)
 
 